@@ -0,0 +1,81 @@
+"""Сериализация постов, групп, профилей и комментариев в словари.
+
+Каждый ресурс описан словарём «поле -> функция», поэтому при
+?fields= вычисляются только запрошенные поля.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+
+
+def _date(value):
+    return value.isoformat()
+
+
+def user_data(user):
+    return {'username': user.username, 'full_name': user.get_full_name()}
+
+
+def user_stat(name):
+    """Счётчик из UserStats; у пользователя без строки счётчиков
+    (например, созданного до миграции) - 0."""
+    def value(user):
+        try:
+            return getattr(user.stats, name)
+        except ObjectDoesNotExist:
+            return 0
+    return value
+
+
+def group_data(group):
+    return {'slug': group.slug, 'title': group.title}
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'created': lambda post: _date(post.created),
+    'updated': lambda post: _date(post.updated),
+    'author': lambda post: user_data(post.author),
+    'group': lambda post: post.group and group_data(post.group),
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+}
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: _date(comment.created),
+    'author': lambda comment: user_data(comment.author),
+}
+GROUP_FIELDS = {
+    'slug': lambda group: group.slug,
+    'title': lambda group: group.title,
+    'description': lambda group: group.description,
+}
+PROFILE_FIELDS = {
+    'username': lambda user: user.username,
+    'full_name': lambda user: user.get_full_name(),
+    'posts_count': user_stat('posts_count'),
+    'followers_count': user_stat('followers_count'),
+    'following_count': user_stat('following_count'),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value, available):
+    """Имена полей из ?fields=a,b; без параметра - все поля."""
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise InvalidFields(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(available)}.'
+        )
+    return fields
+
+
+def serialize(obj, available, fields=None):
+    return {name: available[name](obj) for name in fields or available}
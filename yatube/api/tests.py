@@ -0,0 +1,161 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.settings import POSTS_PER_PAGE
+from posts.tests.utils import QueryBudgetMixin
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+USER_USERNAME = 'TestUser'
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тестовое описание'
+COMMENT_TEXT = 'Тестовый комментарий'
+POSTS_COUNT = POSTS_PER_PAGE + 3
+
+INDEX_URL = reverse('api:index')
+GROUP_URL = reverse('api:group_list', args=[GROUP_SLUG])
+PROFILE_URL = reverse('api:profile', args=[AUTHOR_USERNAME])
+FOLLOW_URL = reverse('api:follow_index')
+UNEXISTING_GROUP_URL = reverse('api:group_list', args=['unexisting'])
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            text=COMMENT_TEXT, post=cls.post, author=cls.user
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.guest = Client()
+        cls.another = Client()
+        cls.another.force_login(cls.user)
+        cls.POST_URL = reverse('api:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.guest).get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response, json.loads(response.content)
+
+    def test_feeds_are_paginated_by_cursor(self):
+        for url, client in [
+            [INDEX_URL, self.guest],
+            [GROUP_URL, self.guest],
+            [PROFILE_URL, self.guest],
+            [FOLLOW_URL, self.another],
+        ]:
+            with self.subTest(url=url):
+                _, first = self.get_json(url, client)
+                self.assertEqual(len(first['results']), POSTS_PER_PAGE)
+                self.assertIsNone(first['previous'])
+                _, second = self.get_json(url, client, after=first['next'])
+                self.assertEqual(
+                    len(second['results']), POSTS_COUNT - POSTS_PER_PAGE
+                )
+                self.assertIsNone(second['next'])
+                _, back = self.get_json(
+                    url, client, before=second['previous']
+                )
+                self.assertEqual(back['results'], first['results'])
+
+    def test_post_detail(self):
+        _, data = self.get_json(self.POST_URL)
+        self.assertEqual(data['post']['id'], self.post.pk)
+        self.assertEqual(data['post']['author']['username'], AUTHOR_USERNAME)
+        self.assertEqual(
+            data['post']['group'],
+            {'slug': GROUP_SLUG, 'title': GROUP_TITLE},
+        )
+        self.assertEqual(data['post']['comments_count'], 1)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            [COMMENT_TEXT],
+        )
+
+    def test_group_and_profile(self):
+        _, data = self.get_json(GROUP_URL)
+        self.assertEqual(data['group']['description'], GROUP_DESCRIPTION)
+        _, data = self.get_json(PROFILE_URL)
+        self.assertEqual(data['profile']['posts_count'], POSTS_COUNT)
+        self.assertEqual(data['profile']['followers_count'], 1)
+
+    def test_profile_without_stats(self):
+        UserStats.objects.filter(user=self.author).delete()
+        response, data = self.get_json(PROFILE_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['profile']['posts_count'], 0)
+        self.assertEqual(data['profile']['followers_count'], 0)
+
+    def test_sparse_fields(self):
+        _, data = self.get_json(INDEX_URL, fields='id, text')
+        self.assertEqual(
+            set(data['results'][0]), {'id', 'text'}
+        )
+        response, data = self.get_json(INDEX_URL, fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', data['detail'])
+
+    def test_errors_are_json(self):
+        response, data = self.get_json(UNEXISTING_GROUP_URL)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', data)
+        response, data = self.get_json(FOLLOW_URL)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.guest.post(INDEX_URL).status_code, 405)
+
+    def test_errors_are_not_revalidated(self):
+        for url, params, status in [
+            [UNEXISTING_GROUP_URL, {}, 404],
+            [INDEX_URL, {'fields': 'id,password'}, 400],
+        ]:
+            with self.subTest(url=url, status=status):
+                response = self.guest.get(url, params)
+                self.assertEqual(response.status_code, status)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_conditional_get(self):
+        response = self.guest.get(self.POST_URL)
+        self.assertEqual(self.guest.get(
+            self.POST_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 304)
+
+    def test_compact_output(self):
+        response = self.guest.get(GROUP_URL)
+        self.assertIn(GROUP_TITLE.encode(), response.content)
+        self.assertNotIn(b'": ', response.content)
+
+    def test_query_budget(self):
+        # Страница постов с авторами и группами; у группы, профиля
+        # и поста - ещё запрос на сам объект и на его валидаторы.
+        for url, budget in [
+            [INDEX_URL, 1],
+            [GROUP_URL, 3],
+            [PROFILE_URL, 3],
+            [self.POST_URL, 3],
+            [f'{INDEX_URL}?fields=id,text', 1],
+        ]:
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.guest, url, budget)
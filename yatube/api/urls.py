@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.index, name='index'),
+    path('v1/posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('v1/groups/<slug:slug>/', views.group_posts, name='group_list'),
+    path('v1/profiles/<str:username>/', views.profile, name='profile'),
+    path('v1/follow/', views.follow_index, name='follow_index'),
+]
@@ -0,0 +1,153 @@
+"""JSON API только для чтения: те же ленты, что и HTML-страницы posts.
+
+Ответы компактные (без пробелов и \\u-экранирования), списки
+пагинируются курсором (?after=, ?before=), ?fields= оставляет только
+нужные поля основного ресурса. Условные GET и кэш страниц работают так
+же, как у HTML-страниц.
+"""
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.paginator import CursorPaginator
+from posts.conditions import (
+    conditional, follow_etag, group_etag, group_last_modified, index_etag,
+    index_last_modified, post_etag, post_last_modified, profile_etag,
+    profile_last_modified,
+)
+from posts.models import Group, Post, User
+from posts.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from posts.timeline import TimelinePaginator
+from .serializers import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, PROFILE_FIELDS,
+    InvalidFields, parse_fields, serialize,
+)
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class NotAuthenticated(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def api_view(etag_func, last_modified_func=None):
+    """Только GET/HEAD, условные GET как у HTML-страниц; 401, 404
+    и неверный ?fields= отдаются в JSON без валидаторов, иначе их
+    перепроверка давала бы 304."""
+    def decorator(view):
+        @conditional(etag_func, last_modified_func)
+        @wraps(view)
+        def json_view(request, *args, **kwargs):
+            return json_response(view(request, *args, **kwargs))
+
+        @require_safe
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            try:
+                return json_view(request, *args, **kwargs)
+            except NotAuthenticated:
+                return error('Требуется авторизация.', 401)
+            except Http404:
+                return error('Не найдено.', 404)
+            except InvalidFields as invalid:
+                return error(str(invalid), 400)
+        return inner
+    return decorator
+
+
+def fields(request, available):
+    return parse_fields(request.GET.get('fields'), available)
+
+
+def posts(request, post_list):
+    """Посты с авторами и группами, если эти поля запрошены."""
+    names = fields(request, POST_FIELDS)
+    return names, post_list.select_related(
+        *[name for name in ('author', 'group') if name in names]
+    )
+
+
+def page(request, paginator, available, names):
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return {
+        'results': [serialize(obj, available, names) for obj in page],
+        'next': page.next_cursor or None,
+        'previous': page.previous_cursor or None,
+    }
+
+
+@api_view(index_etag, index_last_modified)
+def index(request):
+    names, post_list = posts(request, Post.objects.all())
+    return page(
+        request, CursorPaginator(post_list, POSTS_PER_PAGE),
+        POST_FIELDS, names,
+    )
+
+
+@api_view(group_etag, group_last_modified)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    names, post_list = posts(request, group.posts.all())
+    return {
+        'group': serialize(group, GROUP_FIELDS),
+        **page(
+            request, CursorPaginator(post_list, POSTS_PER_PAGE),
+            POST_FIELDS, names,
+        ),
+    }
+
+
+@api_view(profile_etag, profile_last_modified)
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    names, post_list = posts(request, author.posts.all())
+    return {
+        'profile': serialize(author, PROFILE_FIELDS),
+        **page(
+            request, CursorPaginator(post_list, POSTS_PER_PAGE),
+            POST_FIELDS, names,
+        ),
+    }
+
+
+@api_view(post_etag, post_last_modified)
+def post_detail(request, post_id):
+    names, post_list = posts(request, Post.objects.all())
+    post = get_object_or_404(post_list, pk=post_id)
+    return {
+        'post': serialize(post, POST_FIELDS, names),
+        'comments': page(
+            request,
+            CursorPaginator(
+                post.comments.select_related('author'), COMMENTS_PER_PAGE
+            ),
+            COMMENT_FIELDS, None,
+        ),
+    }
+
+
+@api_view(follow_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise NotAuthenticated
+    names = fields(request, POST_FIELDS)
+    return page(
+        request, TimelinePaginator(request.user, POSTS_PER_PAGE),
+        POST_FIELDS, names,
+    )
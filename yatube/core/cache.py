@@ -0,0 +1,35 @@
+"""Бэкенды кэша, которые считают попадания и промахи для core.metrics."""
+import threading
+
+from django.core.cache.backends import locmem
+
+from . import metrics
+
+_missing = object()
+_local = threading.local()
+
+
+class MetricsCacheMixin:
+    """Считает чтения get() и get_many(); get_many базового бэкенда
+    сам вызывает get(), такие чтения не считаются дважды."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if not getattr(_local, 'in_get_many', False):
+            hit = value is not _missing
+            metrics.record_cache(int(hit), int(not hit))
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        _local.in_get_many = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            _local.in_get_many = False
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    pass
@@ -0,0 +1,286 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в памяти и раз в
+METRICS_FLUSH_INTERVAL секунд сбрасывает снимок в свой файл
+METRICS_DIR/<pid>.json. /metrics складывает снимки всех процессов
+(для своего берёт свежие данные из памяти), поэтому метрики
+не зависят от того, какой воркер ответил на запрос сборщика. Без
+METRICS_DIR видны метрики только текущего процесса.
+
+Число и время SQL-запросов, время рендера шаблонов и обращения к кэшу
+за время запроса копятся в RequestStats текущего потока и пишутся
+с именем представления в конце запроса (core.middleware.MetricsMiddleware).
+Так же, без блокировок на каждый вызов, копятся замеры шаблонов,
+include и фильтров при TEMPLATE_PROFILING_ENABLED (core.templating).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+# Тип, описание и границы корзин гистограмм.
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по представлению и статусу.', None,
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'yatube_response_size_bytes': (
+        'histogram', 'Размер ответа.',
+        (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+    'yatube_db_queries_per_request': (
+        'histogram', 'SQL-запросов за запрос.',
+        (1, 2, 3, 5, 8, 13, 21, 50, 100),
+    ),
+    'yatube_db_query_seconds_total': (
+        'counter', 'Время SQL-запросов.', None,
+    ),
+    'yatube_template_render_seconds_total': (
+        'counter', 'Время рендера шаблонов.', None,
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Чтения из кэша: hit или miss.', None,
+    ),
+    'yatube_page_cache_total': (
+        'counter', 'Ответы кэша страниц: hit, stale или miss.', None,
+    ),
+    'yatube_template_call_seconds': (
+        'histogram',
+        'Время вызова шаблона, include или фильтра вместе с вложенными.',
+        (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+    ),
+}
+TEMPLATE_CALL_BUCKETS = METRICS['yatube_template_call_seconds'][2]
+
+
+def new_series(buckets):
+    """Гистограмма: [число в каждой корзине..., сумма, число
+    наблюдений]; последняя корзина - +Inf."""
+    return [0] * (len(buckets) + 3)
+
+
+def add_observation(series, buckets, value):
+    series[bisect_left(buckets, value)] += 1
+    series[-2] += value
+    series[-1] += 1
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_time', 'template_time', 'cache_hits',
+                 'cache_misses', 'renders')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # (вид, имя) -> гистограмма TEMPLATE_CALL_BUCKETS.
+        self.renders = {}
+
+
+_local = threading.local()
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request():
+    _local.stats = None
+
+
+def current():
+    """Статистика запроса текущего потока или None вне запроса."""
+    return getattr(_local, 'stats', None)
+
+
+def record_query(seconds):
+    stats = current()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += seconds
+
+
+def record_template(seconds):
+    stats = current()
+    if stats is not None:
+        stats.template_time += seconds
+
+
+def record_cache(hits, misses):
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def record_render(kind, name, seconds):
+    stats = current()
+    if stats is None:
+        return
+    series = stats.renders.get((kind, name))
+    if series is None:
+        series = stats.renders[(kind, name)] = new_series(
+            TEMPLATE_CALL_BUCKETS
+        )
+    add_observation(series, TEMPLATE_CALL_BUCKETS, seconds)
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (имя, метки) -> значение счётчика или гистограмма.
+        self.values = {}
+        self.flushed = time.monotonic()
+
+    def inc(self, name, labels, value=1):
+        key = (name, _key(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, _key(labels))
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = new_series(buckets)
+            add_observation(series, buckets, value)
+
+    def merge(self, name, labels, observations):
+        """Добавляет гистограмму, собранную за запрос."""
+        key = (name, _key(labels))
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                self.values[key] = observations[:]
+                return
+            for index, part in enumerate(observations):
+                series[index] += part
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                [name, dict(labels), value]
+                for (name, labels), value in self.values.items()
+            ]
+
+    def maybe_flush(self):
+        if (
+            settings.METRICS_DIR
+            and time.monotonic() - self.flushed
+            >= settings.METRICS_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        """Атомарно заменяет файл снимка процесса."""
+        self.flushed = time.monotonic()
+        if not settings.METRICS_DIR:
+            return
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as target:
+            json.dump(self.snapshot(), target)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def _snapshots():
+    yield registry.snapshot()
+    if not settings.METRICS_DIR:
+        return
+    own = f'{os.getpid()}.json'
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith('.json') or name == own:
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as source:
+                yield json.load(source)
+        except (OSError, ValueError):
+            # Файл удалили или процесс ещё не дописал его.
+            continue
+
+
+def collect():
+    """Сумма снимков всех процессов: (имя, метки) -> значение."""
+    values = {}
+    for snapshot in _snapshots():
+        for name, labels, value in snapshot:
+            if name not in METRICS:
+                continue
+            key = (name, _key(labels))
+            if isinstance(value, list):
+                total = values.setdefault(key, [0] * len(value))
+                for index, part in enumerate(value):
+                    total[index] += part
+            else:
+                values[key] = values.get(key, 0) + value
+    return values
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    series = defaultdict(list)
+    for (name, labels), value in sorted(collect().items()):
+        series[name].append((labels, value))
+    lines = []
+    for name, (metric_type, description, buckets) in METRICS.items():
+        if name not in series:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in series[name]:
+            if metric_type != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], value[:-2]):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{_labels(labels, le=bound)} {cumulative}'
+                )
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,210 @@
+import time
+from contextlib import ExitStack
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import metrics, templating
+
+GENERATION_KEY = 'page_cache:generation'
+
+
+def bump_page_generation():
+    """Помечает устаревшими все закэшированные страницы."""
+    cache.set(GENERATION_KEY, uuid4().hex, timeout=None)
+
+
+def page_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэш целых страниц для анонимных читателей.
+
+    Запись живёт PAGE_CACHE_TIMEOUT, но свежей считается только
+    PAGE_CACHE_SOFT_TIMEOUT и пока не сменилось поколение страниц.
+    Устаревшую запись пересчитывает один запрос, взявший блокировку,
+    остальные получают старую копию - истечение кэша под нагрузкой
+    не превращается в лавину одинаковых запросов к базе. Копия из кэша
+    сверяется с If-None-Match и If-Modified-Since запроса, как это
+    сделал бы condition() самого представления.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+            self._store(request, response)
+            return response
+        finally:
+            key = getattr(request, '_page_cache_key', None)
+            if key is not None:
+                cache.delete(self._lock_key(key))
+
+    def _store(self, request, response):
+        key = getattr(request, '_page_cache_key', None)
+        if key is None or not self._storable(response):
+            return
+        cache.set(key, (
+            request._page_cache_generation,
+            time.time() + settings.PAGE_CACHE_SOFT_TIMEOUT,
+            response,
+        ), settings.PAGE_CACHE_TIMEOUT)
+        response['X-Page-Cache'] = 'miss'
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self._cacheable(request):
+            return None
+        key = 'page_cache:' + md5(
+            request.get_full_path().encode()
+        ).hexdigest()
+        generation = page_generation()
+        entry = cache.get(key)
+        if entry is not None:
+            entry_generation, fresh_until, response = entry
+            if entry_generation == generation and time.time() < fresh_until:
+                return self._cached(request, response, 'hit')
+        if not cache.add(
+            self._lock_key(key), 1, settings.PAGE_CACHE_LOCK_TIMEOUT
+        ):
+            if entry is None:
+                return None
+            return self._cached(request, response, 'stale')
+        request._page_cache_key = key
+        request._page_cache_generation = generation
+        return None
+
+    @staticmethod
+    def _cached(request, response, result):
+        last_modified = response.get('Last-Modified')
+        response = get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=last_modified and parse_http_date_safe(
+                last_modified
+            ),
+            response=response,
+        )
+        response['X-Page-Cache'] = result
+        return response
+
+    @staticmethod
+    def _lock_key(key):
+        return f'{key}:lock'
+
+    @staticmethod
+    def _cacheable(request):
+        return (
+            settings.PAGE_CACHE_ENABLED
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.PAGE_CACHE_VIEWS
+            and 'messages' not in request.COOKIES
+            and not request.user.is_authenticated
+        )
+
+    @staticmethod
+    def _storable(response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        )
+
+
+def timed_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """Пишет метрики запроса (core.metrics) с именем представления.
+
+    Стоит первым, чтобы время ответа включало остальные middleware
+    и ответы из кэша страниц. С TEMPLATE_PROFILING_ENABLED добавляет
+    сотрудникам заголовок Server-Timing с разбивкой рендера по
+    шаблонам, include и фильтрам.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timed_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        self._record(request, response, time.perf_counter() - started, stats)
+        if stats.renders and self._staff(request):
+            response['Server-Timing'] = templating.server_timing(stats)
+        return response
+
+    @staticmethod
+    def _staff(request):
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    @staticmethod
+    def _record(request, response, duration, stats):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        labels = {'view': view}
+        registry = metrics.registry
+        registry.inc(
+            'yatube_requests_total',
+            {'view': view, 'status': str(response.status_code)},
+        )
+        registry.observe('yatube_request_duration_seconds', labels, duration)
+        if not response.streaming:
+            registry.observe(
+                'yatube_response_size_bytes', labels, len(response.content)
+            )
+        registry.observe(
+            'yatube_db_queries_per_request', labels, stats.queries
+        )
+        registry.inc('yatube_db_query_seconds_total', labels,
+                     stats.query_time)
+        registry.inc('yatube_template_render_seconds_total', labels,
+                     stats.template_time)
+        for result, count in [('hit', stats.cache_hits),
+                              ('miss', stats.cache_misses)]:
+            if count:
+                registry.inc(
+                    'yatube_cache_requests_total',
+                    {'view': view, 'result': result}, count,
+                )
+        for (kind, name), series in stats.renders.items():
+            registry.merge(
+                'yatube_template_call_seconds',
+                {'view': view, 'kind': kind, 'name': name}, series,
+            )
+        page_cache = response.get('X-Page-Cache')
+        if page_cache:
+            registry.inc(
+                'yatube_page_cache_total',
+                {'view': view, 'result': page_cache},
+            )
+        registry.maybe_flush()
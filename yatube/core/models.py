@@ -1,7 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 
 
-class CreatedModel(models.Model):
+class AtomicSaveModel(models.Model):
+    """Сохранение и обработчики post_save выполняются в одной транзакции."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class CreatedModel(AtomicSaveModel):
     created = models.DateTimeField(
         'Дата создания',
         auto_now_add=True
@@ -10,3 +21,17 @@ class CreatedModel(models.Model):
     class Meta:
         abstract = True
         ordering = ('-created', )
+
+
+class StoredFile(models.Model):
+    """Файл хранилища с адресацией по содержимому и число ссылок на него
+    (см. core.storage)."""
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+    references = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
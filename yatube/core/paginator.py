@@ -0,0 +1,107 @@
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+def encode_cursor(value, pk, number):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return urlsafe_base64_encode(force_bytes(f'{number}|{pk}|{value}'))
+
+
+def decode_cursor(token, parse_value=parse_datetime):
+    """Возвращает (value, pk, number) или None для битого курсора."""
+    try:
+        number, pk, value = force_text(
+            urlsafe_base64_decode(token)
+        ).split('|', 2)
+        value = parse_value(value)
+        number, pk = int(number), int(pk)
+    except (TypeError, ValueError):
+        return None
+    if value is None or number < 1:
+        return None
+    return value, pk, number
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по полю сортировки модели и pk.
+
+    Вместо LIMIT/OFFSET страница выбирается условием
+    ``(created, id) < (курсор)``, поэтому любая страница стоит столько же,
+    сколько первая, а COUNT(*) не выполняется.
+    """
+
+    # Разбор значения поля сортировки из курсора.
+    parse_value = staticmethod(parse_datetime)
+
+    def __init__(self, object_list, per_page, ordering=None):
+        super().__init__(object_list, per_page)
+        self._num_pages = 1
+        ordering = ordering or object_list.model._meta.ordering[0]
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+
+    def _order(self, reverse, pk='pk'):
+        prefix = '-' if self.descending != reverse else ''
+        return f'{prefix}{self.field}', f'{prefix}{pk}'
+
+    def _seek(self, object_list, cursor, reverse, pk='pk'):
+        value, key = cursor
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        # Нестрогое условие по полю сортировки задаёт диапазон в индексе,
+        # иначе OR заставил бы базу идти по индексу с самого начала.
+        return object_list.filter(
+            Q(**{f'{self.field}__{lookup}e': value}),
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{f'{pk}__{lookup}': key}),
+        )
+
+    def _fetch(self, cursor, reverse):
+        """Первые per_page + 1 объектов после курсора в нужную сторону."""
+        object_list = self.object_list
+        if cursor is not None:
+            object_list = self._seek(object_list, cursor, reverse)
+        return list(
+            object_list.order_by(*self._order(reverse))[:self.per_page + 1]
+        )
+
+    @property
+    def num_pages(self):
+        """Число страниц, известных по последней выбранной странице."""
+        return self._num_pages
+
+    def get_page(self, after=None, before=None):
+        cursor = decode_cursor(after or before or '', self.parse_value)
+        if cursor is None:
+            return self._build_page(self._fetch(None, False), 1)
+        value, pk, number = cursor
+        reverse = not after
+        return self._build_page(
+            self._fetch((value, pk), reverse), number, reverse
+        )
+
+    def _build_page(self, object_list, number, reverse=False):
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if reverse:
+            object_list.reverse()
+            if len(object_list) < self.per_page and not has_more:
+                # Перед курсором меньше страницы: отдаём честную первую.
+                return self.get_page()
+            if not has_more:
+                number = 1
+            has_more = True
+        self._num_pages = number + has_more
+        page = Page(object_list, number, self)
+        page.next_cursor = self._cursor(page, -1, number + 1)
+        page.previous_cursor = self._cursor(page, 0, number - 1)
+        return page
+
+    def _cursor(self, page, index, number):
+        if not page or not 1 <= number <= self._num_pages:
+            return ''
+        obj = page[index]
+        return encode_cursor(getattr(obj, self.field), obj.pk, number)
@@ -0,0 +1,177 @@
+"""Выборочный журнал медленных SQL-запросов.
+
+SlowQueryMiddleware оборачивает выполнение запросов к базе. Запрос
+дольше SLOW_QUERY_THRESHOLD секунд с вероятностью
+SLOW_QUERY_SAMPLE_RATE пишется в логгер yatube.slow_queries: SQL,
+параметры, длительность, план (EXPLAIN QUERY PLAN для SQLite),
+представление запроса, а также узел шаблона и строка кода проекта,
+из-за которых запрос выполнился. Быстрые запросы стоят два вызова
+perf_counter; стек и план разбираются только для попавших в журнал.
+JsonFormatter пишет каждую запись одной строкой JSON.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger('yatube.slow_queries')
+
+# Длинные параметры (тексты постов) обрезаются.
+MAX_PARAM_LENGTH = 200
+EXPLAINED = ('SELECT', 'WITH')
+_local = threading.local()
+
+
+def _param(value):
+    if isinstance(value, (bytes, memoryview)):
+        return f'<{len(value)} байт>'
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    value = str(value)
+    if len(value) > MAX_PARAM_LENGTH:
+        return value[:MAX_PARAM_LENGTH] + '…'
+    return value
+
+
+def _plan(connection, sql, params):
+    """План запроса; выполняется курсором бэкенда в обход обёрток
+    execute, чтобы не попасть ни в журнал, ни в метрики."""
+    prefix = connection.ops.explain_query_prefix()
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{prefix} {sql}', params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _origin(connection):
+    """Узел шаблона и строка кода проекта, откуда пришёл запрос;
+    обёртки execute (журнал, метрики) пропускаются."""
+    template = None
+    frame_info = None
+    base_dir = str(settings.BASE_DIR) + os.sep
+    wrappers = {
+        getattr(wrapper, '__code__', None)
+        for wrapper in connection.execute_wrappers
+    }
+    frame = sys._getframe(2)
+    while frame is not None and (template is None or frame_info is None):
+        code = frame.f_code
+        if template is None and code is Node.render_annotated.__code__:
+            node = frame.f_locals['self']
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = {
+                    'name': origin.template_name or origin.name,
+                    'line': token.lineno,
+                    'node': token.contents[:MAX_PARAM_LENGTH],
+                }
+        elif (
+            frame_info is None
+            and code.co_filename.startswith(base_dir)
+            and code not in wrappers
+        ):
+            frame_info = {
+                'file': os.path.relpath(code.co_filename, base_dir),
+                'line': frame.f_lineno,
+                'function': code.co_name,
+            }
+        frame = frame.f_back
+    return template, frame_info
+
+
+def _request_info():
+    request = getattr(_local, 'request', None)
+    if request is None:
+        return None, None
+    match = getattr(request, 'resolver_match', None)
+    return (
+        match.view_name if match else None,
+        f'{request.method} {request.path}',
+    )
+
+
+def log_slow_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if (
+        duration >= settings.SLOW_QUERY_THRESHOLD
+        and random.random() < settings.SLOW_QUERY_SAMPLE_RATE
+    ):
+        _log(context['connection'], sql, params, many, duration)
+    return result
+
+
+def _log(connection, sql, params, many, duration):
+    template, frame = _origin(connection)
+    view, request = _request_info()
+    plan = None
+    if not many and sql.lstrip().upper().startswith(EXPLAINED):
+        try:
+            plan = _plan(connection, sql, params)
+        except Exception as error:
+            # Журнал не должен ломать запрос, на который он смотрит.
+            plan = [f'{type(error).__name__}: {error}']
+    logger.warning('Медленный запрос %.1f мс', duration * 1000, extra={
+        'slow_query': {
+            'duration_ms': round(duration * 1000, 3),
+            'sql': sql,
+            'params': (
+                None if params is None or many
+                else [_param(value) for value in params]
+            ),
+            'many': many,
+            'database': connection.alias,
+            'plan': plan,
+            'view': view,
+            'request': request,
+            'template': template,
+            'frame': frame,
+        },
+    })
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала одной строкой JSON."""
+
+    def format(self, record):
+        return json.dumps({
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'pid': record.process,
+            **getattr(record, 'slow_query', {}),
+        }, ensure_ascii=False, default=str)
+
+
+class SlowQueryMiddleware:
+    """Включает журнал медленных запросов на время запроса."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.request = request
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(log_slow_query)
+                    )
+                return self.get_response(request)
+        finally:
+            _local.request = None
@@ -0,0 +1,110 @@
+"""Хранилище медиа с адресацией по содержимому.
+
+Файл называется по SHA-256 своего содержимого, поэтому одинаковые
+загрузки хранятся один раз, а однажды выданный URL никогда не указывает
+на другие байты и кэшируется навсегда (IMMUTABLE_CACHE_CONTROL).
+Один файл могут делить несколько записей, поэтому ссылки на него
+считаются в StoredFile: retain() при появлении ссылки, release() при
+её исчезновении; файл без ссылок удаляется после коммита. Файлы
+с обычными именами (загруженные раньше) ни с кем не делятся и учёта
+ссылок не требуют.
+
+save() берёт временную ссылку до проверки exists() и снимает её после
+коммита: иначе release() другой записи мог бы удалить файл, который
+save() уже решил не записывать, до retain() новой записи. Поэтому
+сохранение файла и retain() должны идти в одной транзакции.
+"""
+import hashlib
+import posixpath
+import re
+from collections import Counter, defaultdict
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from .models import StoredFile
+
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_immutable(name):
+    return bool(name) and HASHED_NAME.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Сохраняет ``posts/photo.JPG`` как ``posts/ab/ab…ef.jpg``."""
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, basename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(basename)[1].lower()
+        return posixpath.join(
+            directory, hexdigest[:2], hexdigest + extension
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        retain([name])
+        transaction.on_commit(lambda: release([name], self))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def retain(names):
+    """Добавляет ссылки на файлы; имена с одинаковым числом ссылок
+    обновляются одним запросом."""
+    counts = Counter(filter(is_immutable, names))
+    if not counts:
+        return
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name) for name in counts], ignore_conflicts=True
+    )
+    by_count = defaultdict(list)
+    for name, count in counts.items():
+        by_count[count].append(name)
+    for count, names in by_count.items():
+        StoredFile.objects.filter(name__in=names).update(
+            references=F('references') + count
+        )
+
+
+def release(names, storage=content_storage):
+    """Снимает ссылки на файлы и удаляет файлы, на которые никто
+    не ссылается."""
+    names = list(filter(is_immutable, names))
+    for name in names:
+        StoredFile.objects.filter(name=name, references__gt=0).update(
+            references=F('references') - 1
+        )
+    orphans = StoredFile.objects.filter(name__in=names, references=0)
+    orphaned = list(orphans.values_list('name', flat=True))
+    if not orphaned:
+        return
+    orphans.delete()
+
+    def delete_files():
+        # После коммита на файл могли сослаться снова.
+        referenced = set(StoredFile.objects.filter(
+            name__in=orphaned
+        ).values_list('name', flat=True))
+        for name in orphaned:
+            if name not in referenced:
+                storage.delete(name)
+    transaction.on_commit(delete_files)
@@ -0,0 +1,145 @@
+"""Шаблонизатор Django, который замеряет рендер шаблонов для
+core.metrics. Всегда меряются только шаблоны верхнего уровня: include
+рендерится внутри них и уже входит в их время.
+
+С TEMPLATE_PROFILING_ENABLED install() дополнительно оборачивает
+рендер каждого шаблона (и вложенного), каждый {% include %} и фильтры
+подключаемых библиотек ({% load %}), например
+core.templatetags.user_filters.addclass. Время вызова включает
+вложенные вызовы. Замеры копятся за запрос, попадают в метрику
+yatube_template_call_seconds, а сотрудникам приходят разбивкой
+по вызовам в заголовке Server-Timing (server_timing()).
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.template import base, loader_tags
+from django.template.backends import django
+
+from . import metrics
+
+# Столько самых долгих шаблонов, include и фильтров попадает
+# в Server-Timing.
+SERVER_TIMING_LIMIT = 20
+STRING_TEMPLATE = '<string>'
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template(time.perf_counter() - started)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    def __init__(self, params):
+        super().__init__(params)
+        if settings.TEMPLATE_PROFILING_ENABLED:
+            install(self.engine)
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+
+def _timed(function, kind, name):
+    """Обёртка, которая пишет время вызова в metrics.record_render;
+    name - строка или функция от аргументов вызова."""
+    @wraps(function)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.record_render(
+                kind, name(*args) if callable(name) else name,
+                time.perf_counter() - started,
+            )
+    timed.profiled = True
+    return timed
+
+
+def _template_name(template, context):
+    return template.origin.template_name or STRING_TEMPLATE
+
+
+def _include_name(node, context):
+    """«вложенный шаблон <- шаблон:строка» - имя места include."""
+    name = getattr(node, '_profile_name', None)
+    if name is None:
+        included = node.template.token.strip('\'"')
+        parent = node.origin.template_name or STRING_TEMPLATE
+        name = node._profile_name = (
+            f'{included} <- {parent}:{node.token.lineno}'
+        )
+    return name
+
+
+def install(engine):
+    """Включает замеры шаблонов, include и фильтров библиотек engine."""
+    if not getattr(base.Template._render, 'profiled', False):
+        base.Template._render = _timed(
+            base.Template._render, 'template', _template_name
+        )
+    if not getattr(loader_tags.IncludeNode.render, 'profiled', False):
+        loader_tags.IncludeNode.render = _timed(
+            loader_tags.IncludeNode.render, 'include', _include_name
+        )
+    for library in engine.template_libraries.values():
+        for name, function in library.filters.items():
+            if not getattr(function, 'profiled', False):
+                library.filters[name] = _timed(
+                    function, 'filter',
+                    f'{function.__module__}.{function.__name__}',
+                )
+    _reset(engine)
+
+
+def _reset(engine):
+    """Сбрасывает кэш шаблонов: фильтры берутся при разборе шаблона."""
+    for loader in engine.template_loaders:
+        loader.reset()
+
+
+def uninstall(engine):
+    """Снимает обёртки install()."""
+    for owner, attribute in [(base.Template, '_render'),
+                             (loader_tags.IncludeNode, 'render')]:
+        function = getattr(owner, attribute)
+        if getattr(function, 'profiled', False):
+            setattr(owner, attribute, function.__wrapped__)
+    for library in engine.template_libraries.values():
+        for name, function in library.filters.items():
+            if getattr(function, 'profiled', False):
+                library.filters[name] = function.__wrapped__
+    _reset(engine)
+
+
+def _quote(value):
+    value = value.encode('ascii', 'backslashreplace').decode()
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def server_timing(stats):
+    """Значение заголовка Server-Timing: общее время шаблонов и самые
+    долгие по сумме шаблоны, include и фильтры запроса."""
+    entries = [
+        f'templates;dur={stats.template_time * 1000:.2f};'
+        f'desc="templates total"'
+    ]
+    renders = sorted(
+        stats.renders.items(), key=lambda item: item[1][-2], reverse=True
+    )
+    for number, ((kind, name), series) in enumerate(
+        renders[:SERVER_TIMING_LIMIT], 1
+    ):
+        entries.append(
+            f'tpl{number};dur={series[-2] * 1000:.2f};'
+            f'desc={_quote(f"{kind} {name} x{series[-1]}")}'
+        )
+    return ', '.join(entries)
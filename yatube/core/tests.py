@@ -1,7 +1,40 @@
-from django.test import TestCase, Client
+import json
+import os
+import shutil
+import tempfile
+from hashlib import md5
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template, engines
+from django.urls import reverse
+
+from posts.models import Post, User
+from . import metrics, slow_queries, templating
+from .models import StoredFile
+from .storage import (
+    IMMUTABLE_CACHE_CONTROL, ContentAddressedStorage, is_immutable,
+)
+from .views import media
 
 
 UNEXISTING_PAGE = '/unexisting_page/'
+METRICS_URL = reverse('metrics')
+INDEX_URL = '/'
+PROFILE_URL = reverse('posts:profile', args=['TestAuthor'])
+POST_CREATE_URL = reverse('posts:post_create')
+ADDCLASS = 'core.templatetags.user_filters.addclass'
+USERNAME = 'TestAuthor'
+POST_TEXT = 'Тестовый текст'
+NEW_POST_TEXT = 'Новый текст'
+IMAGE_CONTENT = b'GIF89a-test-content'
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class CustomErrorPages(TestCase):
@@ -13,3 +46,338 @@ class CustomErrorPages(TestCase):
     def test_404_template_used(self):
         self.assertTemplateUsed(self.guest.get(UNEXISTING_PAGE),
                                 'core/404.html')
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=USERNAME)
+        cls.post = Post.objects.create(text=POST_TEXT, author=cls.author_user)
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.author_user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_is_served_from_cache(self):
+        self.assertEqual(self.guest.get(INDEX_URL)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.guest.get(INDEX_URL)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertIn(POST_TEXT, response.content.decode())
+
+    def test_cached_page_is_revalidated(self):
+        etag = self.guest.get(INDEX_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.guest.get(
+            INDEX_URL, HTTP_IF_NONE_MATCH='"other"'
+        ).status_code, 200)
+
+    def test_authenticated_page_is_not_cached(self):
+        self.author.get(INDEX_URL)
+        self.assertFalse(self.author.get(INDEX_URL).has_header('X-Page-Cache'))
+
+    def test_cache_is_invalidated_when_posts_change(self):
+        self.guest.get(INDEX_URL)
+        Post.objects.create(text=NEW_POST_TEXT, author=self.author_user)
+        response = self.guest.get(INDEX_URL)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertIn(NEW_POST_TEXT, response.content.decode())
+
+    @override_settings(PAGE_CACHE_SOFT_TIMEOUT=0)
+    def test_stale_page_is_served_while_another_request_recomputes(self):
+        self.guest.get(INDEX_URL)
+        key = 'page_cache:' + md5(INDEX_URL.encode()).hexdigest()
+        cache.add(f'{key}:lock', 1)
+        with self.assertNumQueries(0):
+            response = self.guest.get(INDEX_URL)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        cache.delete(f'{key}:lock')
+        self.assertEqual(self.guest.get(INDEX_URL)['X-Page-Cache'], 'miss')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('core.storage.transaction.on_commit', lambda func: func())
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.storage = Post._meta.get_field('image').storage
+
+    def create_post(self, name):
+        return Post.objects.create(
+            text=POST_TEXT, author=self.author,
+            image=ContentFile(IMAGE_CONTENT, name=name),
+        )
+
+    def test_same_content_is_stored_once(self):
+        storage = ContentAddressedStorage(location=TEMP_MEDIA_ROOT)
+        first = storage.save('posts/one.GIF', ContentFile(IMAGE_CONTENT))
+        second = storage.save('posts/two.gif', ContentFile(IMAGE_CONTENT))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('posts/'))
+        self.assertTrue(first.endswith('.gif'))
+        self.assertTrue(is_immutable(first))
+        other = storage.save('posts/three.gif', ContentFile(b'other'))
+        self.assertNotEqual(other, first)
+
+    def test_file_is_deleted_with_last_reference(self):
+        first = self.create_post('one.gif')
+        second = self.create_post('two.gif')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+        first.delete()
+        self.assertTrue(self.storage.exists(name))
+        second.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post('one.gif')
+        name = post.image.name
+        post.image = ContentFile(b'new content', name='new.gif')
+        post.save()
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(
+            StoredFile.objects.get(name=post.image.name).references, 1
+        )
+
+    def test_file_saved_during_release_is_kept(self):
+        first = self.create_post('one.gif')
+        name = first.image.name
+        callbacks = []
+        with mock.patch('core.storage.transaction.on_commit',
+                        callbacks.append):
+            # Файл первого поста ещё не удалён, а такой же уже загружают.
+            first.delete()
+            self.create_post('two.gif')
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).references, 1)
+
+    def test_hashed_media_is_served_as_immutable(self):
+        post = self.create_post('one.gif')
+        request = RequestFactory().get(post.image.url)
+        response = media(
+            request, post.image.name, document_root=TEMP_MEDIA_ROOT
+        )
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=USERNAME)
+        Post.objects.create(text=POST_TEXT, author=cls.author_user)
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def metrics(self):
+        response = self.guest.get(METRICS_URL)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_metrics_by_view(self):
+        self.guest.get(INDEX_URL)
+        self.guest.get(INDEX_URL)
+        text = self.metrics()
+        self.assertIn(
+            'yatube_requests_total{status="200",view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        for name in [
+            'yatube_response_size_bytes_sum{view="posts:index"}',
+            'yatube_db_queries_per_request_sum{view="posts:index"}',
+            'yatube_db_query_seconds_total{view="posts:index"}',
+            'yatube_template_render_seconds_total{view="posts:index"}',
+            'yatube_cache_requests_total{result="hit",view="posts:index"}',
+            'yatube_cache_requests_total{result="miss",view="posts:index"}',
+        ]:
+            with self.subTest(name=name):
+                self.assertIn(name, text)
+
+    def test_query_count_per_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest.get(INDEX_URL)
+        value = metrics.registry.values[(
+            'yatube_db_queries_per_request', (('view', 'posts:index'),)
+        )]
+        self.assertEqual(value[-2], len(queries))
+        self.assertEqual(value[-1], 1)
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cache_results(self):
+        self.guest.get(INDEX_URL)
+        self.guest.get(INDEX_URL)
+        text = self.metrics()
+        for result in ['miss', 'hit']:
+            with self.subTest(result=result):
+                self.assertIn(
+                    f'yatube_page_cache_total{{result="{result}",'
+                    f'view="posts:index"}} 1', text
+                )
+
+    def test_metrics_are_summed_across_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, '1.json'), 'w') as snapshot:
+            json.dump([[
+                'yatube_requests_total',
+                {'view': 'posts:index', 'status': '200'},
+                5,
+            ]], snapshot)
+        with override_settings(METRICS_DIR=directory):
+            self.guest.get(INDEX_URL)
+            metrics.registry.flush()
+            self.assertTrue(
+                os.path.exists(os.path.join(directory, f'{os.getpid()}.json'))
+            )
+            self.assertIn(
+                'yatube_requests_total{status="200",view="posts:index"} 6',
+                self.metrics(),
+            )
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_are_hidden_from_other_hosts(self):
+        self.assertEqual(self.guest.get(METRICS_URL).status_code, 404)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0)
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=USERNAME)
+        Post.objects.create(text=POST_TEXT, author=cls.author_user)
+        cls.guest = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_queries_are_logged_with_view_plan_and_frame(self):
+        with self.assertLogs(slow_queries.logger) as logs:
+            self.guest.get(PROFILE_URL)
+        entries = [record.slow_query for record in logs.records]
+        self.assertTrue(entries)
+        for entry in entries:
+            with self.subTest(sql=entry['sql']):
+                self.assertEqual(entry['view'], 'posts:profile')
+                self.assertEqual(entry['request'], f'GET {PROFILE_URL}')
+                self.assertTrue(entry['plan'])
+                self.assertNotEqual(entry['frame']['file'],
+                                    'core/middleware.py')
+        self.assertIn(USERNAME, entries[0]['params'])
+        self.assertIn('posts/views.py',
+                      [entry['frame']['file'] for entry in entries])
+
+    def test_template_node_is_attributed(self):
+        template = Template('Постов:\n{{ posts.count }}')
+        with self.assertLogs(slow_queries.logger) as logs:
+            with connection.execute_wrapper(slow_queries.log_slow_query):
+                template.render(Context({'posts': Post.objects.all()}))
+        entry = logs.records[0].slow_query
+        self.assertEqual(entry['template']['line'], 2)
+        self.assertEqual(entry['template']['node'], 'posts.count')
+        self.assertIsNone(entry['view'])
+
+    @override_settings(SLOW_QUERY_SAMPLE_RATE=0)
+    def test_sampling(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs(slow_queries.logger):
+                self.guest.get(PROFILE_URL)
+
+    def test_json_formatter(self):
+        with self.assertLogs(slow_queries.logger) as logs:
+            self.guest.get(PROFILE_URL)
+        line = slow_queries.JsonFormatter().format(logs.records[0])
+        self.assertNotIn('\n', line)
+        entry = json.loads(line)
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['view'], 'posts:profile')
+        self.assertIn('SELECT', entry['sql'])
+
+
+class TemplateProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(
+            username=USERNAME, is_staff=True
+        )
+        Post.objects.create(text=POST_TEXT, author=cls.author_user)
+        cls.staff = Client()
+        cls.staff.force_login(cls.author_user)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        engine = engines.all()[0].engine
+        templating.install(engine)
+        self.addCleanup(templating.uninstall, engine)
+
+    def test_staff_get_server_timing_breakdown(self):
+        header = self.staff.get(PROFILE_URL)['Server-Timing']
+        self.assertTrue(header.startswith('templates;dur='))
+        for entry in [
+            'template posts/profile.html x1',
+            'template posts/includes/post.html x1',
+            'include posts/includes/post.html <- posts/profile.html:34 x1',
+        ]:
+            with self.subTest(entry=entry):
+                self.assertIn(f'desc="{entry}"', header)
+        self.assertIn(
+            f'desc="filter {ADDCLASS} x',
+            self.staff.get(POST_CREATE_URL)['Server-Timing'],
+        )
+
+    def test_calls_in_metrics(self):
+        self.staff.get(POST_CREATE_URL)
+        text = self.client.get(METRICS_URL).content.decode()
+        self.assertIn(
+            'yatube_template_call_seconds_count{kind="filter",'
+            f'name="{ADDCLASS}",view="posts:post_create"}} ', text
+        )
+        self.assertIn(
+            'yatube_template_call_seconds_count{kind="template",'
+            'name="posts/create_post.html",view="posts:post_create"} 1',
+            text,
+        )
+
+    def test_guest_gets_no_breakdown(self):
+        self.assertNotIn('Server-Timing', self.client.get(PROFILE_URL))
+
+    def test_disabled_by_default(self):
+        templating.uninstall(engines.all()[0].engine)
+        self.assertNotIn('Server-Timing', self.staff.get(PROFILE_URL))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл, пока она не больше
+    UPLOAD_MAX_FILE_SIZE.
+
+    Остаток слишком большого файла читается из запроса, но не
+    сохраняется, а у файла выставляется ``too_large`` - форма
+    превращает его в ошибку поля.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_FILE_SIZE:
+            self.too_large = True
+        if not self.too_large:
+            super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.too_large = self.too_large
+        return file
@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.views.static import serve
+
+from .metrics import render as render_metrics
+from .storage import IMMUTABLE_CACHE_CONTROL, is_immutable
 
 
 def page_not_found(request, exception):
@@ -11,3 +17,21 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def media(request, path, document_root=None, show_indexes=False):
+    """Отдаёт медиа, файлы с именем по содержимому - как неизменяемые."""
+    response = serve(request, path, document_root, show_indexes)
+    if response.status_code in (200, 304) and is_immutable(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def metrics(request):
+    """Метрики для Prometheus; доступны только с METRICS_ALLOWED_IPS."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
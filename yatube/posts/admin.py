@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Post, Group, Comment, Follow
+from .search import build_query, matching_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        query = build_query(search_term)
+        if not query:
+            return queryset, False
+        return queryset.filter(pk__in=matching_ids(query)), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,137 @@
+"""Бенчмарк страниц posts на синтетических данных (posts.dataset).
+
+Каждая страница запрашивается repeat раз от имени читателя с самой
+большой лентой подписок, на самых тяжёлых объектах: группе и авторе
+с наибольшим числом постов и посте с наибольшим числом комментариев.
+Время снимается без трассировки; число SQL-запросов и пик выделенной
+Python-памяти (tracemalloc) - отдельным запросом, чтобы трассировка
+не искажала время.
+"""
+import gc
+import math
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, UserStats
+
+PERCENTILES = (50, 90, 99)
+# С baseline сравниваются устойчивые метрики; p99 и среднее
+# на десятках запросов слишком шумные.
+COMPARED_METRICS = ('p50_ms', 'p90_ms', 'queries', 'memory_kb')
+# Разница во времени меньше этой - шум, а не регрессия.
+TIME_SLACK_MS = 1.0
+BENCHMARK_TEXT = 'Бенчмарк'
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    values = sorted(values)
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def requests():
+    """Читатель и запросы бенчмарка: (страница, метод, url, данные)."""
+    group = Group.objects.annotate(
+        posts_count=Count('posts')
+    ).order_by('-posts_count').first()
+    author = UserStats.objects.select_related('user').order_by(
+        '-posts_count'
+    ).first().user
+    reader = UserStats.objects.select_related('user').order_by(
+        '-following_count'
+    ).first().user
+    post = Post.objects.order_by('-comments_count').first()
+    return reader, [
+        ['posts:index', 'get', reverse('posts:index'), None],
+        ['posts:group_list', 'get',
+         reverse('posts:group_list', args=[group.slug]), None],
+        ['posts:profile', 'get',
+         reverse('posts:profile', args=[author.username]), None],
+        ['posts:post_detail', 'get',
+         reverse('posts:post_detail', args=[post.pk]), None],
+        ['posts:follow_index', 'get', reverse('posts:follow_index'), None],
+        ['posts:post_create', 'post', reverse('posts:post_create'),
+         {'text': BENCHMARK_TEXT}],
+        ['posts:add_comment', 'post',
+         reverse('posts:add_comment', args=[post.pk]),
+         {'text': BENCHMARK_TEXT}],
+    ]
+
+
+def measure(repeat, warm=False):
+    """Результаты по страницам; без warm кэш очищается перед каждым
+    запросом, и меряется путь через базу."""
+    reader, pages = requests()
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(reader)
+    results = {}
+    for name, method, url, data in pages:
+        request = getattr(client, method)
+        # Первый запрос загружает шаблоны и прогревает базу.
+        request(url, data)
+        timings = []
+        # Как timeit: сборка мусора посреди запроса - шум замера.
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                if not warm:
+                    cache.clear()
+                started = time.perf_counter()
+                response = request(url, data)
+                timings.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{url}: {response.status_code}')
+        finally:
+            gc.enable()
+        if not warm:
+            cache.clear()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            request(url, data)
+        memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {
+            **{
+                f'p{percent}_ms': round(
+                    percentile(timings, percent) * 1000, 3
+                )
+                for percent in PERCENTILES
+            },
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'queries': len(queries),
+            'memory_kb': round(memory / 1024, 1),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии относительно baseline: время и память больше чем
+    в 1 + tolerance раз, запросов - больше хоть на один."""
+    regressions = []
+    for size, pages in results.items():
+        for name, metrics in pages.items():
+            expected = baseline.get(size, {}).get(name, {})
+            for metric in COMPARED_METRICS:
+                if metric not in expected:
+                    continue
+                value = metrics[metric]
+                limit = expected[metric]
+                if metric != 'queries':
+                    limit *= 1 + tolerance
+                if metric.endswith('_ms'):
+                    limit += TIME_SLACK_MS
+                if value > limit:
+                    regressions.append(
+                        f'{size} {name} {metric}: {value} > '
+                        f'{expected[metric]}'
+                    )
+    return regressions
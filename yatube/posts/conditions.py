@@ -0,0 +1,163 @@
+"""Валидаторы условных GET-запросов для лент и страницы поста.
+
+ETag собирается из поколений лент, которые показывает страница
+(posts.feeds), или из updated, последнего комментария и comments_count
+поста, а также из пользователя и адреса, поэтому запись в одной ленте
+не сбрасывает валидаторы остальных. Last-Modified - время последней
+смены тех же поколений (у поста - ещё updated и последний
+комментарий): прокси и роботы присылают только If-Modified-Since,
+и он должен устаревать вместе с ETag.
+"""
+from functools import wraps
+from hashlib import md5
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .feeds import (
+    ALL_FEEDS, INDEX_FEED, author_feed, feed_versions, group_feed,
+    versions_modified,
+)
+from .models import Comment, Group, Post, User
+from .timeline import followed_author_ids
+
+
+def _state(request, load):
+    """load() один раз на запрос: ETag и Last-Modified страницы берутся
+    из одного запроса к базе."""
+    if not hasattr(request, '_condition_state'):
+        request._condition_state = load()
+    return request._condition_state
+
+
+def _versions(request, *feeds):
+    # ALL_FEEDS меняется при переименовании групп и пользователей.
+    if not hasattr(request, '_feed_versions'):
+        request._feed_versions = feed_versions([*feeds, ALL_FEEDS])
+    return request._feed_versions
+
+
+def _etag(request, *parts):
+    user = request.user.pk if request.user.is_authenticated else ''
+    return md5(':'.join(
+        [*map(str, parts), str(user), request.get_full_path()]
+    ).encode()).hexdigest()
+
+
+def _feeds_etag(request, *feeds):
+    return _etag(request, *_versions(request, *feeds))
+
+
+def _feeds_modified(request, *feeds):
+    return versions_modified(_versions(request, *feeds))
+
+
+def index_etag(request):
+    return _feeds_etag(request, INDEX_FEED)
+
+
+def index_last_modified(request):
+    return _feeds_modified(request, INDEX_FEED)
+
+
+def _group_id(request, slug):
+    return _state(request, lambda: Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first())
+
+
+def group_etag(request, slug):
+    group_id = _group_id(request, slug)
+    return group_id and _feeds_etag(request, group_feed(group_id))
+
+
+def group_last_modified(request, slug):
+    group_id = _group_id(request, slug)
+    return group_id and _feeds_modified(request, group_feed(group_id))
+
+
+def _author_id(request, username):
+    return _state(request, lambda: User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first())
+
+
+def profile_etag(request, username):
+    # Лента автора меняется и при подписках на него и его подписках:
+    # от них зависят счётчики и кнопка подписки в профиле.
+    author_id = _author_id(request, username)
+    return author_id and _feeds_etag(request, author_feed(author_id))
+
+
+def profile_last_modified(request, username):
+    author_id = _author_id(request, username)
+    return author_id and _feeds_modified(request, author_feed(author_id))
+
+
+def _post_state(request, post_id):
+    return _state(request, lambda: Post.objects.filter(pk=post_id).annotate(
+        last_comment=Subquery(Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by('-created').values('created')[:1])
+    ).values_list(
+        'updated', 'last_comment', 'comments_count', 'author_id'
+    ).first())
+
+
+def post_etag(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    updated, last_comment, comments_count, author_id = state
+    return _etag(
+        request, updated.isoformat(),
+        last_comment and last_comment.isoformat(), comments_count,
+        *_versions(request, author_feed(author_id)),
+    )
+
+
+def post_last_modified(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    updated, last_comment, _, author_id = state
+    return max(date for date in [
+        updated, last_comment,
+        _feeds_modified(request, author_feed(author_id)),
+    ] if date is not None)
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    # Своя лента автора меняется при подписке и отписке.
+    return _feeds_etag(request, author_feed(request.user.pk), *(
+        author_feed(author_id)
+        for author_id in followed_author_ids(request.user.pk)
+    ))
+
+
+def conditional(etag_func, last_modified_func=None):
+    """condition() с обязательной перепроверкой кэша.
+
+    no-cache не даёт браузеру эвристически отдать страницу из своего
+    кэша без запроса, а private - положить в общий кэш персональную
+    страницу.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag_func, last_modified_func=last_modified_func
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(
+                response,
+                no_cache=True,
+                private=request.user.is_authenticated,
+            )
+            return response
+        return inner
+    return decorator
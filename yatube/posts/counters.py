@@ -0,0 +1,57 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются атомарным ``UPDATE ... SET x = x + 1`` в той же
+транзакции, что и сохранение или удаление объекта; ``recount`` чинит
+расхождения после массовых операций в обход сигналов.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _shift(field, delta):
+    # Расхождение после массовых операций не должно уводить счётчик в минус.
+    return Greatest(F(field) + delta, 0)
+
+
+def change_user_stats(user_id, **deltas):
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: _shift(field, delta) for field, delta in deltas.items()
+    })
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shift('comments_count', delta)
+    )
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount():
+    """Пересчитывает все счётчики по фактическим данным."""
+    with transaction.atomic():
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        UserStats.objects.update(
+            posts_count=_count(Post.objects, 'author'),
+            followers_count=_count(Follow.objects, 'author'),
+            following_count=_count(Follow.objects, 'user'),
+        )
+        Post.objects.update(comments_count=_count(Comment.objects, 'post'))
@@ -0,0 +1,188 @@
+"""Синтетические данные: пользователи, группы, посты, комментарии
+и подписки в формате записей import_yatube.
+
+Активность авторов, популярность авторов и внимание к постам
+распределены по Ципфу: немногие авторы пишут большую часть постов
+и собирают большую часть подписчиков, а комментарии достаются
+немногим постам. Кто много пишет и кто популярен, выбирается
+независимо. Число подписок пользователя распределено по Парето,
+поэтому граф подписок степенной с обеих сторон. Посты выходят
+всплесками: моменты группируются вокруг случайных центров, сила
+которых тоже распределена по Парето.
+
+Набор полностью определяется параметрами и seed. Картинки рисуются
+в пуле процессов, но каждая - своим генератором от (seed, номер),
+поэтому не зависят от порядка работы процессов.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from random import Random
+
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+USERNAME = 'user{}'
+GROUP_SLUG = 'group-{}'
+POSTS_PER_USER = 10
+USERS_PER_GROUP = 100
+GROUP_SHARE = 0.5
+COMMENTS_PER_POST = 1
+FOLLOWS_PER_USER = 10
+# Показатель Парето числа подписок пользователя; больше 1, иначе
+# у распределения нет среднего.
+FOLLOWS_ALPHA = 2.0
+ACTIVITY_EXPONENT = 1.0
+POPULARITY_EXPONENT = 1.0
+ATTENTION_EXPONENT = 1.0
+# Всплески: в среднем постов на всплеск, длина всплеска (доля
+# периода) и показатель Парето силы всплеска; 0 - посты равномерно.
+POSTS_PER_BURST = 50
+BURST_LENGTH = 0.002
+BURST_ALPHA = 1.5
+# Фиксированное начало, а не «год назад»: иначе даты зависели бы
+# от дня запуска.
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+PERIOD = timedelta(days=365)
+IMAGE_SIZE = (960, 540)
+IMAGE_NAME = 'post_{}.jpg'
+WORDS = (
+    'лес', 'туман', 'ёжик', 'лошадка', 'река', 'город', 'утро', 'кот',
+    'книга', 'дорога', 'снег', 'море', 'чай', 'вечер', 'друг', 'песня',
+)
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def timestamps(count, random, burst_alpha=BURST_ALPHA):
+    """count моментов периода по возрастанию."""
+    if not burst_alpha:
+        return [START + PERIOD * number / count for number in range(count)]
+    centers = [
+        random.random() for _ in range(max(count // POSTS_PER_BURST, 1))
+    ]
+    weights = list(accumulate(
+        random.paretovariate(burst_alpha) for _ in centers
+    ))
+    moments = sorted(
+        min(center + random.expovariate(1 / BURST_LENGTH), 1.0)
+        for center in random.choices(centers, cum_weights=weights, k=count)
+    )
+    return [START + PERIOD * moment for moment in moments]
+
+
+def synthesize(seed, number, directory):
+    """Рисует картинку поста: фон и несколько фигур."""
+    random = Random(f'{seed}:{number}')
+
+    def color():
+        return tuple(random.randrange(256) for _ in range(3))
+
+    width, height = IMAGE_SIZE
+    image = Image.new('RGB', IMAGE_SIZE, color())
+    draw = ImageDraw.Draw(image)
+    for _ in range(random.randint(3, 8)):
+        left, right = sorted(random.randrange(width) for _ in range(2))
+        top, bottom = sorted(random.randrange(height) for _ in range(2))
+        shape = draw.ellipse if random.random() < 0.5 else draw.rectangle
+        shape([left, top, right, bottom], fill=color())
+    path = os.path.join(directory, IMAGE_NAME.format(number))
+    image.save(path, 'JPEG', quality=85)
+    return path
+
+
+def _images(numbers, seed, directory, workers):
+    """Пути картинок постов numbers по порядку; рисуют workers
+    процессов (1 - текущий)."""
+    arguments = ([seed] * len(numbers), numbers, [directory] * len(numbers))
+    if workers <= 1:
+        yield from map(synthesize, *arguments)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(synthesize, *arguments, chunksize=16)
+
+
+def records(posts, seed=0, users=None, groups=None,
+            comments_per_post=COMMENTS_PER_POST,
+            follows_per_user=FOLLOWS_PER_USER,
+            activity_exponent=ACTIVITY_EXPONENT,
+            popularity_exponent=POPULARITY_EXPONENT,
+            burst_alpha=BURST_ALPHA, images=0.0, image_dir=None,
+            workers=1):
+    """Записи набора; images - доля постов с картинками, которые
+    рисуются в каталог image_dir."""
+    random = Random(seed)
+    users = users or max(posts // POSTS_PER_USER, 2)
+    groups = groups or max(users // USERS_PER_GROUP, 1)
+    usernames = [USERNAME.format(number) for number in range(users)]
+    slugs = [GROUP_SLUG.format(number) for number in range(groups)]
+    for username in usernames:
+        yield {'type': 'user', 'username': username}
+    for number, slug in enumerate(slugs):
+        yield {
+            'type': 'group',
+            'slug': slug,
+            'title': f'Группа {number}',
+            'description': f'Описание группы {number}',
+        }
+    writers = usernames[:]
+    random.shuffle(writers)
+    authors = random.choices(
+        writers, cum_weights=zipf_weights(users, activity_exponent), k=posts
+    )
+    created = timestamps(posts, random, burst_alpha)
+    illustrated = [
+        number for number in range(posts) if random.random() < images
+    ]
+    paths = _images(illustrated, seed, image_dir, workers)
+    illustrated = set(illustrated)
+    for number in range(posts):
+        yield {
+            'type': 'post',
+            'id': number,
+            'author': authors[number],
+            'group': (
+                random.choice(slugs) if random.random() < GROUP_SHARE
+                else ''
+            ),
+            'text': ' '.join(random.choices(WORDS, k=20)),
+            'created': created[number],
+            'image': next(paths) if number in illustrated else '',
+        }
+    end = START + PERIOD
+    hot = list(range(posts))
+    random.shuffle(hot)
+    commented = random.choices(
+        hot, cum_weights=zipf_weights(posts, ATTENTION_EXPONENT),
+        k=round(posts * comments_per_post),
+    )
+    for post in commented:
+        yield {
+            'type': 'comment',
+            'post': post,
+            'author': random.choice(usernames),
+            'text': ' '.join(random.choices(WORDS, k=8)),
+            'created': (
+                created[post] + (end - created[post]) * random.random()
+            ),
+        }
+    popular = usernames[:]
+    random.shuffle(popular)
+    popularity = zipf_weights(users, popularity_exponent)
+    # Среднее Парето с минимумом 1 - alpha / (alpha - 1).
+    scale = follows_per_user * (FOLLOWS_ALPHA - 1) / FOLLOWS_ALPHA
+    for username in usernames:
+        count = min(
+            round(scale * random.paretovariate(FOLLOWS_ALPHA)), users - 1
+        )
+        followed = set(
+            random.choices(popular, cum_weights=popularity, k=count)
+        )
+        for author in sorted(followed - {username}):
+            yield {'type': 'follow', 'user': username, 'author': author}
@@ -0,0 +1,106 @@
+"""Потоковая выгрузка постов и комментариев в NDJSON или CSV.
+
+Записи читаются из базы кусками (``iterator(chunk_size=...)``) сразу
+с именами авторов и slug групп и тут же превращаются в строки, поэтому
+память не растёт с размером выгрузки. Формат записей тот же, что
+читает ``import_yatube``: выгрузку можно загрузить в другую базу.
+"""
+import csv
+import json
+from io import StringIO
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import compress_sequence
+
+from .models import Comment, Post
+from .settings import EXPORT_BUFFER_SIZE, EXPORT_CHUNK_SIZE
+
+FORMATS = ('ndjson', 'csv')
+CSV_FIELDS = (
+    'type', 'id', 'post', 'author', 'group', 'text', 'created', 'updated',
+    'image',
+)
+POST_VALUES = {
+    'id': 'id',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'created': 'created',
+    'updated': 'updated',
+    'image': 'image',
+}
+COMMENT_VALUES = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _records(queryset, record_type, values):
+    rows = queryset.order_by('pk').values_list(*values.values())
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {'type': record_type, **dict(zip(values, row))}
+
+
+def records(group=None, author=None, comments=True):
+    """Посты группы и/или автора (без фильтров - все), затем
+    комментарии к ним."""
+    posts = Post.objects.all()
+    if group:
+        posts = posts.filter(group__slug=group)
+    if author:
+        posts = posts.filter(author__username=author)
+    yield from _records(posts, 'post', POST_VALUES)
+    if comments:
+        yield from _records(
+            Comment.objects.filter(post__in=posts.values('pk')),
+            'comment', COMMENT_VALUES,
+        )
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+def csv_lines(records):
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def lines(records, export_format):
+    return (csv_lines if export_format == 'csv' else ndjson_lines)(records)
+
+
+def buffered(lines, size=EXPORT_BUFFER_SIZE):
+    """Склеивает строки в куски около size символов: и сокет,
+    и gzip плохо работают с кусками по одной строке."""
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def stream(records, export_format, gzip=False):
+    """Куски выгрузки в байтах, сжатые gzip на лету, если нужно."""
+    chunks = (
+        chunk.encode() for chunk in buffered(lines(records, export_format))
+    )
+    return compress_sequence(chunks) if gzip else chunks
@@ -0,0 +1,136 @@
+"""Ленты постов: ключи и поколения лент, пагинатор с кэшированным
+числом записей."""
+import time
+from datetime import datetime, timezone
+from math import ceil
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from core.paginator import CursorPaginator
+from .settings import (
+    FEED_CACHE_TIMEOUT, FEED_COUNT_CACHE_TIMEOUT, FEED_COUNT_LIMIT,
+)
+
+INDEX_FEED = 'index'
+# Меняется при переименовании групп и пользователей, которые видны
+# в любой ленте.
+ALL_FEEDS = 'all'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feeds(post, group_ids=()):
+    """Ленты, в которые попадает пост (и группы, откуда он ушёл)."""
+    feeds = {INDEX_FEED, author_feed(post.author_id)}
+    feeds.update(
+        group_feed(group_id)
+        for group_id in {post.group_id, *group_ids} if group_id
+    )
+    return feeds
+
+
+def version_key(feed):
+    return f'feed_version:{feed}'
+
+
+def new_version():
+    return f'{time.time():.6f}:{uuid4().hex}'
+
+
+def bump_versions(feeds):
+    """Делает недействительными все закэшированные страницы лент.
+
+    Поколение - случайная строка, а не счётчик, поэтому вытеснение
+    ключа из кэша не может вернуть старое поколение. В начале поколения
+    - время его смены, из него берётся Last-Modified ленты.
+    """
+    cache.set_many(
+        {version_key(feed): new_version() for feed in feeds}, timeout=None
+    )
+
+
+def feed_versions(feeds):
+    """Поколения лент по порядку; недостающие создаются."""
+    keys = [version_key(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            if key not in versions:
+                cache.add(key, new_version(), timeout=None)
+        versions = cache.get_many(keys)
+    return [versions.get(key, '') for key in keys]
+
+
+def versions_modified(versions):
+    """Время последней смены поколений или None, если его нет."""
+    stamps = []
+    for version in versions:
+        stamp, _, rest = version.partition(':')
+        if rest:
+            stamps.append(float(stamp))
+    if not stamps:
+        return None
+    return datetime.fromtimestamp(max(stamps), timezone.utc)
+
+
+def page_cache(request, feed):
+    """Таймаут и ключ для {% cache %} страницы ленты."""
+    return {
+        'timeout': FEED_CACHE_TIMEOUT,
+        'key': ':'.join([
+            feed,
+            *feed_versions([feed, ALL_FEEDS]),
+            request.GET.get('after', ''),
+            request.GET.get('before', ''),
+        ]),
+    }
+
+
+def count_key(feed):
+    return f'feed_count:{feed}'
+
+
+def invalidate_counts(feeds):
+    cache.delete_many([count_key(feed) for feed in feeds])
+
+
+class FeedPaginator(CursorPaginator):
+    """Курсорная лента, общее число записей которой берётся из кэша.
+
+    На промахе COUNT(*) ограничен FEED_COUNT_LIMIT строками, поэтому
+    стоимость подсчёта не растёт с размером ленты; для больших лент
+    число становится оценкой, а диапазон страниц обрезается.
+    """
+
+    def __init__(self, object_list, per_page, feed):
+        super().__init__(object_list, per_page)
+        self.feed = feed
+
+    @cached_property
+    def _bounded_count(self):
+        key = count_key(self.feed)
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list[:FEED_COUNT_LIMIT + 1].count()
+            cache.set(key, count, FEED_COUNT_CACHE_TIMEOUT)
+        return count
+
+    @property
+    def count(self):
+        return min(self._bounded_count, FEED_COUNT_LIMIT)
+
+    @property
+    def count_is_estimate(self):
+        return self._bounded_count > FEED_COUNT_LIMIT
+
+    @property
+    def total_pages(self):
+        return max(ceil(self.count / self.per_page), 1)
@@ -1,6 +1,9 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import normalize
 from .models import Post, Comment
+from .settings import IMAGE_MAX_PIXELS
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +11,37 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Недокачанный файл не отдаём полю: Pillow счёл бы его битым.
+        self.image_too_large = getattr(
+            self.files.get(self.add_prefix('image')), 'too_large', False
+        )
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files[self.add_prefix('image')]
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if self.image_too_large:
+            raise forms.ValidationError(
+                'Файл слишком большой.', code='file_too_large'
+            )
+        if not isinstance(image, UploadedFile):
+            return image
+        width, height = image.image.size
+        if width * height > IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Слишком большое изображение: %(pixels)s Мп, '
+                'допустимо не больше %(limit)s Мп.',
+                code='too_many_pixels',
+                params={
+                    'pixels': width * height // 10 ** 6,
+                    'limit': IMAGE_MAX_PIXELS // 10 ** 6,
+                },
+            )
+        return normalize(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,87 @@
+"""Нормализация загруженных картинок постов.
+
+Картинка декодируется сразу в уменьшенном виде (draft для JPEG, reduce
+при ресайзе), поворачивается по EXIF и пересохраняется без метаданных
+в исходном формате (MPO - в JPEG, прочие - в JPEG или, при
+прозрачности, в PNG), не больше IMAGE_MASTER_SIZE по большей стороне.
+Так память процесса не зависит от размера загрузки, а в хранилище
+не попадают многомегапиксельные оригиналы с геотегами.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+from .settings import IMAGE_MASTER_QUALITY, IMAGE_MASTER_SIZE
+
+# Форматы, которые сохраняются как есть.
+MASTER_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+# MPO (снимки камер и телефонов) - JPEG с дополнительными кадрами,
+# сохраняется первый кадр.
+FORMAT_ALIASES = {'MPO': 'JPEG'}
+# Остальные форматы: без прозрачности - в JPEG, с прозрачностью - в PNG.
+FALLBACK_FORMAT = 'JPEG'
+ALPHA_FALLBACK_FORMAT = 'PNG'
+ALPHA_MODES = {'RGBA', 'RGBa', 'LA', 'La', 'PA'}
+# Ключи Image.info, которые переносятся в сохранённую картинку.
+RENDER_INFO = {'transparency', 'background'}
+
+
+def _open(uploaded):
+    if hasattr(uploaded, 'temporary_file_path'):
+        return Image.open(uploaded.temporary_file_path())
+    uploaded.seek(0)
+    return Image.open(uploaded)
+
+
+def _master_format(source):
+    image_format = FORMAT_ALIASES.get(source.format, source.format)
+    if image_format in MASTER_FORMATS:
+        return image_format
+    if source.mode in ALPHA_MODES or 'transparency' in source.info:
+        return ALPHA_FALLBACK_FORMAT
+    return FALLBACK_FORMAT
+
+
+def _save_options(image_format):
+    if image_format == 'JPEG':
+        return {
+            'quality': IMAGE_MASTER_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if image_format == 'WEBP':
+        return {'quality': IMAGE_MASTER_QUALITY}
+    return {'optimize': True}
+
+
+def normalize(uploaded):
+    """Возвращает файл с нормализованной картинкой.
+
+    Результат ограничен IMAGE_MASTER_SIZE, поэтому держится в памяти.
+    """
+    size = (IMAGE_MASTER_SIZE, IMAGE_MASTER_SIZE)
+    with _open(uploaded) as source:
+        image_format = _master_format(source)
+        # JPEG декодируется сразу с уменьшением в 2-8 раз.
+        source.draft('RGB', size)
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail(size, Image.LANCZOS, reducing_gap=3.0)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # Писатели PNG и GIF берут EXIF, ICC-профиль и комментарии из info,
+    # поэтому от него остаётся только то, что нужно для отрисовки.
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key in RENDER_INFO
+    }
+    buffer = BytesIO()
+    image.save(buffer, image_format, **_save_options(image_format))
+    image.close()
+    stem = os.path.splitext(os.path.basename(uploaded.name))[0]
+    return InMemoryUploadedFile(
+        buffer, None,
+        f'{stem}.{MASTER_FORMATS[image_format]}',
+        Image.MIME[image_format], buffer.tell(), None,
+    )
@@ -0,0 +1,127 @@
+import json
+import os
+import platform
+import sqlite3
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import benchmark, dataset, importer
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Меряет время ответа, число запросов и память страниц posts '
+            'на синтетических базах заданных размеров; результаты пишет '
+            'в JSON и сравнивает с сохранённым baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10**4, 10**5, 10**6],
+            help='Числа постов в базах.'
+        )
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кэш между запросами.'
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--baseline', help='Прошлые результаты для сравнения.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост времени и памяти, доля.'
+        )
+        parser.add_argument(
+            '--database-dir', default=settings.BASE_DIR,
+            help='Каталог баз бенчмарка benchmark_<размер>.sqlite3.'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Оставить базы и взять их при следующем запуске.'
+        )
+
+    def handle(self, *args, sizes, repeat, seed, warm, output, baseline,
+               tolerance, database_dir, keepdb, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite.')
+        results = {}
+        # Отладочные панель и журнал запросов искажают замеры.
+        with override_settings(DEBUG=False):
+            for size in sizes:
+                results[str(size)] = self.run(
+                    size, repeat, seed, warm,
+                    os.path.join(database_dir, f'benchmark_{size}.sqlite3'),
+                    keepdb,
+                )
+        with open(output, 'w') as target:
+            json.dump({
+                'environment': {
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'sqlite': sqlite3.sqlite_version,
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                },
+                'options': {'seed': seed, 'repeat': repeat, 'warm': warm},
+                'created': timezone.now().isoformat(),
+                'results': results,
+            }, target, indent=2)
+        self.stdout.write(f'Результаты записаны в {output}.')
+        if baseline:
+            with open(baseline) as source:
+                expected = json.load(source)['results']
+            regressions = benchmark.compare(results, expected, tolerance)
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def run(self, size, repeat, seed, warm, name, keepdb):
+        test_settings = connection.settings_dict['TEST']
+        previous_name = test_settings['NAME']
+        test_settings['NAME'] = name
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+        )
+        try:
+            if not Post.objects.exists():
+                self.stdout.write(f'Наполнение базы: {size} постов...')
+                started = time.monotonic()
+                importer.load(dataset.records(size, seed))
+                self.stdout.write(
+                    f'Готово за {time.monotonic() - started:.0f} с.'
+                )
+            # Записи бенчмарка откатываются, и база остаётся той же
+            # для следующего запуска с --keepdb.
+            with transaction.atomic():
+                results = benchmark.measure(repeat, warm)
+                transaction.set_rollback(True)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=keepdb
+            )
+            test_settings['NAME'] = previous_name
+        self.report(size, results)
+        return results
+
+    def report(self, size, results):
+        self.stdout.write(f'\n{size} постов')
+        self.stdout.write(
+            f'{"страница":<20}{"p50":>9}{"p90":>9}{"p99":>9}'
+            f'{"запросов":>10}{"КБ":>10}'
+        )
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<20}{metrics["p50_ms"]:>9}{metrics["p90_ms"]:>9}'
+                f'{metrics["p99_ms"]:>9}{metrics["queries"]:>10}'
+                f'{metrics["memory_kb"]:>10}'
+            )
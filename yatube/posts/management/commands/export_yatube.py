@@ -0,0 +1,50 @@
+import gzip
+
+from django.core.management.base import BaseCommand
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты и комментарии к ним в NDJSON или CSV потоком, '
+            'в формате import_yatube. Файл с расширением .gz сжимается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--author', help='Имя пользователя автора.')
+        parser.add_argument(
+            '--format', choices=exporter.FORMATS,
+            default=exporter.FORMATS[0], dest='export_format',
+        )
+        parser.add_argument(
+            '--no-comments', action='store_false', dest='comments',
+            help='Только посты.'
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл выгрузки; по умолчанию - стандартный вывод.'
+        )
+
+    def handle(self, *args, group, author, export_format, comments, output,
+               **options):
+        records = self.count(
+            exporter.records(group=group, author=author, comments=comments)
+        )
+        chunks = exporter.buffered(exporter.lines(records, export_format))
+        if output == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        opener = gzip.open if output.endswith('.gz') else open
+        with opener(output, 'wt', encoding='utf-8', newline='') as target:
+            for chunk in chunks:
+                target.write(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено записей: {self.exported}.'
+        ))
+
+    def count(self, records):
+        self.exported = 0
+        for record in records:
+            self.exported += 1
+            yield record
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import dataset, importer
+from posts.models import Post
+
+PROGRESS_EVERY = 100000
+
+
+class Command(BaseCommand):
+    help = ('Наполняет пустую базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками с реалистичными '
+            'распределениями. Одинаковые параметры и --seed дают '
+            'одинаковые данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--users', type=int,
+            help=f'По умолчанию - постов / {dataset.POSTS_PER_USER}.'
+        )
+        parser.add_argument(
+            '--groups', type=int,
+            help=f'По умолчанию - пользователей / '
+                 f'{dataset.USERS_PER_GROUP}.'
+        )
+        parser.add_argument(
+            '--comments-per-post', type=float,
+            default=dataset.COMMENTS_PER_POST,
+        )
+        parser.add_argument(
+            '--follows-per-user', type=float,
+            default=dataset.FOLLOWS_PER_USER,
+            help='Среднее число подписок (распределено по Парето).'
+        )
+        parser.add_argument(
+            '--activity-exponent', type=float,
+            default=dataset.ACTIVITY_EXPONENT,
+            help='Показатель Ципфа числа постов авторов.'
+        )
+        parser.add_argument(
+            '--popularity-exponent', type=float,
+            default=dataset.POPULARITY_EXPONENT,
+            help='Показатель Ципфа числа подписчиков авторов.'
+        )
+        parser.add_argument(
+            '--burst-alpha', type=float, default=dataset.BURST_ALPHA,
+            help='Показатель Парето силы всплесков; меньше - резче, '
+                 '0 - посты равномерно.'
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинками.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Процессов для рисования картинок; 1 - без пула.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, posts, users, groups, comments_per_post,
+               follows_per_user, activity_exponent, popularity_exponent,
+               burst_alpha, images, workers, seed, batch_size, **options):
+        if Post.objects.exists():
+            raise CommandError(
+                'В базе уже есть посты: набор воспроизводим только '
+                'в пустой базе.'
+            )
+        started = time.monotonic()
+        # Картинки нужны только до копирования в хранилище.
+        with tempfile.TemporaryDirectory() as image_dir:
+            imported = importer.load(self.progress(dataset.records(
+                posts, seed, users=users, groups=groups,
+                comments_per_post=comments_per_post,
+                follows_per_user=follows_per_user,
+                activity_exponent=activity_exponent,
+                popularity_exponent=popularity_exponent,
+                burst_alpha=burst_alpha, images=images,
+                image_dir=image_dir, workers=workers,
+            ), started), batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + ', '.join(
+                f'{record_type} {count}'
+                for record_type, count in imported.items()
+            ) + f' за {time.monotonic() - started:.0f} с.'
+        ))
+        if images:
+            self.stdout.write(
+                'Миниатюры и варианты картинок: manage.py rebuild_thumbnails'
+            )
+
+    def progress(self, records, started):
+        for number, record in enumerate(records, start=1):
+            yield record
+            if number % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{number} записей за {elapsed:.0f} с '
+                    f'({number / max(elapsed, 1e-6):.0f} записей/с)'
+                )
@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+CHUNK_SIZE = 100
+
+
+def prepare(post_id, name, force):
+    try:
+        thumbnails.prepare(post_id, name, force)
+    except Exception as error:
+        return f'{name}: {error}'
+    finally:
+        connections.close_all()
+    return None
+
+
+class Command(BaseCommand):
+    help = ('Пересоздаёт миниатюры и варианты всех картинок постов в пуле '
+            'процессов (после смены геометрии). Прогресс сохраняется, '
+            'прерванный запуск продолжается с --resume.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов; 1 - без пула, в текущем процессе.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Удалить уже созданные миниатюры перед генерацией.'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с поста, на котором остановился прошлый запуск.'
+        )
+        parser.add_argument(
+            '--state-file',
+            default=os.path.join(settings.MEDIA_ROOT, '.rebuild_thumbnails'),
+            help='Файл с id последнего обработанного поста.'
+        )
+
+    def handle(self, *args, workers, force, resume, state_file, **options):
+        start = self.read_state(state_file) if resume else 0
+        posts = Post.objects.filter(pk__gt=start).exclude(image='')
+        total = posts.count()
+        if not total:
+            self.stdout.write('Картинок для обработки нет.')
+            return
+        done = failed = 0
+        # Дочерние процессы не должны наследовать открытые соединения.
+        connections.close_all()
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            last_id = start
+            while True:
+                chunk = list(posts.filter(pk__gt=last_id).order_by(
+                    'pk'
+                ).values_list('pk', 'image')[:CHUNK_SIZE])
+                if not chunk:
+                    break
+                post_ids, names = zip(*chunk)
+                forces = [force] * len(chunk)
+                errors = (
+                    pool.map(prepare, post_ids, names, forces) if pool
+                    else map(prepare, post_ids, names, forces)
+                )
+                for error in errors:
+                    if error:
+                        failed += 1
+                        self.stderr.write(error)
+                done += len(chunk)
+                # Пачка обработана целиком, её можно не повторять.
+                last_id = chunk[-1][0]
+                self.write_state(state_file, last_id)
+                self.stdout.write(f'{done}/{total}')
+        finally:
+            if pool:
+                pool.shutdown()
+        os.remove(state_file)
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры пересозданы: {done - failed}, ошибок: {failed}.'
+        ))
+
+    @staticmethod
+    def read_state(state_file):
+        try:
+            with open(state_file) as state:
+                return int(state.read())
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def write_state(state_file, last_id):
+        os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+        with open(state_file, 'w') as state:
+            state.write(str(last_id))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает материализованные ленты подписок '
+            '(после импорта данных или смены TIMELINE_FANOUT_LIMIT).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи, чьи ленты пересобрать; по умолчанию все.'
+        )
+
+    def handle(self, *args, usernames, **options):
+        users = None
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+        timeline.rebuild(users)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны.'))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='fanout_skipped',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Без раскладки по лентам'),
+        ),
+    ]
@@ -1,8 +1,11 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
 
-from core.models import CreatedModel
+from core.models import AtomicSaveModel, CreatedModel
+from core.storage import content_storage
 
 
 User = get_user_model()
@@ -30,7 +33,8 @@ class Post(CreatedModel):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
     group = models.ForeignKey(
         Group,
@@ -39,29 +43,80 @@ class Post(CreatedModel):
         null=True,
         related_name='posts',
         verbose_name='Группа',
-        help_text='Выберите группу'
+        help_text='Выберите группу',
+        db_index=False
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False
+    )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы лент повторяют сортировку курсорной пагинации
+        # (created, id); по updated считается Last-Modified.
+        indexes = [
+            models.Index(fields=['created', 'id'], name='post_created'),
+            models.Index(fields=['author', 'created', 'id'],
+                         name='post_author_created'),
+            models.Index(fields=['group', 'created', 'id'],
+                         name='post_group_created'),
+            models.Index(fields=['updated'], name='post_updated'),
+            models.Index(fields=['author', 'updated'],
+                         name='post_author_updated'),
+            models.Index(fields=['group', 'updated'],
+                         name='post_group_updated'),
+        ]
 
     def __str__(self):
         return (f'{self.text[:15]} {self.created}'
                 f' {self.author.username} {self.group}')
 
+    @property
+    def files(self):
+        """Имена всех файлов поста в хранилище: картинка и варианты."""
+        return [self.image.name] + [
+            variant['name'] for variant in self.variants
+        ]
+
+    @property
+    def variants(self):
+        """Готовые варианты картинки: format, width, height, name."""
+        try:
+            return json.loads(self.image_variants or '[]')
+        except ValueError:
+            return []
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
-        verbose_name='Пост'
+        verbose_name='Пост',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -77,20 +132,26 @@ class Comment(CreatedModel):
     class Meta(CreatedModel.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created'),
+        ]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='follower',
-        verbose_name='Подписчик'
+        verbose_name='Подписчик',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='following',
-        verbose_name='Подписка'
+        verbose_name='Подписка',
+        db_index=False
     )
 
     class Meta:
@@ -100,3 +161,68 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique follow'),
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются сигналами при
+    создании и удалении постов и подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, db_index=True
+    )
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    # Посты автора не раскладываются по лентам и подмешиваются при
+    # чтении; меняется только вместе с лентами (posts.timeline).
+    fanout_skipped = models.BooleanField(
+        'Без раскладки по лентам', default=False, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    Заполняется при публикации поста (fan-out-on-write); ``created``
+    копируется из поста, чтобы лента читалась одним индексом.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ('-created', '-post')
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique timeline entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created', '-post'],
+                         name='timeline_user_created'),
+        ]
@@ -0,0 +1,165 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс ``posts_post_fts`` хранит только токены: текст берётся из
+``posts_post`` (external content), а синхронизацию выполняют триггеры,
+поэтому индекс не расходится с таблицей даже при bulk_create и update().
+Токенизатор unicode61 приводит кириллицу к нижнему регистру; стеммера
+для русского в SQLite нет, поэтому каждое слово запроса ищется
+как префикс.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from core.paginator import CursorPaginator
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_TOKENS = 32
+
+CREATE_INDEX_SQL = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2"
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END''',
+]
+DROP_INDEX_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+REBUILD_INDEX_SQL = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+)
+OPTIMIZE_INDEX_SQL = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+)
+
+
+def restore_triggers(using=connection):
+    """Возвращает триггеры синхронизации, если индекс уже создан.
+
+    Миграции SQLite пересоздают таблицу posts_post при изменении схемы
+    и теряют её триггеры, поэтому вызывается после каждого migrate.
+    """
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        if cursor.fetchone() is None:
+            return
+        for sql in CREATE_INDEX_SQL[1:]:
+            cursor.execute(sql)
+
+
+def drop_triggers(using=connection):
+    """Снимает триггеры на время массовой вставки постов: индекс потом
+    дешевле пересобрать целиком через rebuild_index."""
+    if using.vendor != 'sqlite':
+        return
+    with using.cursor() as cursor:
+        for sql in DROP_INDEX_SQL[:-1]:
+            cursor.execute(sql)
+
+
+def rebuild_index(using=connection):
+    with using.cursor() as cursor:
+        for sql in CREATE_INDEX_SQL:
+            cursor.execute(sql)
+        cursor.execute(REBUILD_INDEX_SQL)
+        cursor.execute(OPTIMIZE_INDEX_SQL)
+
+
+def build_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова как префиксы."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def matching_ids(query):
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [query],
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорная выдача поиска по (релевантность bm25, id).
+
+    Страница читается из индекса FTS5 одним запросом, посты с авторами
+    и группами догружаются вторым; у поста появляются ``rank`` и
+    ``snippet`` с подсвеченными совпадениями.
+    """
+    parse_value = float
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.none(), per_page, ordering='rank')
+        self.query = query
+
+    def _fetch(self, cursor, reverse):
+        if not self.query:
+            return []
+        order = 'DESC' if reverse else 'ASC'
+        sql = [
+            f'SELECT rowid, bm25({FTS_TABLE}) AS score,',
+            f'snippet({FTS_TABLE}, 0, %s, %s, %s, %s)',
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        ]
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, '…', SNIPPET_TOKENS,
+                  self.query]
+        if cursor is not None:
+            op = '<' if reverse else '>'
+            sql.append(
+                f'AND (score {op} %s OR (score = %s AND rowid {op} %s))'
+            )
+            params.extend([cursor[0], cursor[0], cursor[1]])
+        sql.append(f'ORDER BY score {order}, rowid {order} LIMIT %s')
+        params.append(self.per_page + 1)
+        with connection.cursor() as db:
+            db.execute(' '.join(sql), params)
+            rows = db.fetchall()
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [row[0] for row in rows]
+        )
+        results = []
+        for post_id, rank, snippet in rows:
+            post = posts.get(post_id)
+            if post is not None:
+                post.rank = rank
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
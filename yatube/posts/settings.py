@@ -1 +1,48 @@
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# Авторы с большим числом подписчиков не раскладываются по лентам при
+# публикации, их посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 1000
+# Столько последних постов автора попадает в ленту при подписке на него
+# и когда он перестаёт быть популярным; более старые в ленте не видны.
+TIMELINE_BACKFILL_SIZE = 100
+POPULAR_AUTHORS_CACHE_KEY = 'timeline:popular_authors'
+POPULAR_AUTHORS_CACHE_TIMEOUT = 5 * 60
+# Список авторов в подписках (для ETag ленты подписок); сбрасывается
+# при подписке и отписке.
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+# Число записей в ленте считается не дальше этого порога, дальше
+# показывается оценка «более N», а диапазон страниц обрезается.
+FEED_COUNT_LIMIT = 10000
+FEED_COUNT_CACHE_TIMEOUT = 60 * 60
+# Фрагменты лент кэшируются по поколению ленты и странице; поколение
+# меняется сигналами, поэтому срок жизни ограничен только памятью кэша.
+FEED_CACHE_TIMEOUT = 10 * 60
+# Миниатюры картинок постов, те же, что в тегах {% thumbnail %}
+# шаблонов: генерируются заранее, чтобы первый читатель не ждал Pillow.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+THUMBNAIL_WORKERS = 2
+# Адаптивные варианты картинки поста: ширины, пропорции кадра как у
+# миниатюры 960x339 и форматы в порядке предпочтения (JPEG - запасной,
+# форматы без поддержки в установленном Pillow пропускаются).
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+IMAGE_VARIANT_RATIO = (960, 339)
+IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_SIZES = '(min-width: 1000px) 960px, 100vw'
+# Заглушка картинки, встроенная в страницу: JPEG шириной в несколько
+# пикселей, около полукилобайта в base64.
+IMAGE_PLACEHOLDER_WIDTH = 16
+IMAGE_PLACEHOLDER_QUALITY = 60
+# Загруженная картинка: предел по числу пикселей (проверяется по
+# заголовку, до декодирования) и размер хранимого оригинала.
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_MASTER_SIZE = 2048
+IMAGE_MASTER_QUALITY = 85
+# Выгрузка: записей в одном куске чтения из базы и символов в одном
+# куске ответа.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
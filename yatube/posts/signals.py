@@ -0,0 +1,143 @@
+from django.db import connections
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_save,
+)
+from django.dispatch import receiver
+
+from core import storage
+from core.middleware import bump_page_generation
+
+from . import counters, feeds, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые выводятся в лентах.
+USER_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    instance._previous_group_ids = ()
+    instance._replaced_files = None
+    if instance._state.adding or raw:
+        return
+    previous = Post.objects.filter(pk=instance.pk).only(
+        'group', 'image', 'image_variants'
+    ).first()
+    if previous is None:
+        return
+    instance._previous_group_ids = (previous.group_id,)
+    if previous.image.name != instance.image.name:
+        # Варианты и заглушка прежней картинки к новой не подходят.
+        instance.image_variants = ''
+        instance.image_placeholder = ''
+        instance._replaced_files = previous.files
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        timeline.fan_out(instance)
+    post_feeds = feeds.post_feeds(instance, instance._previous_group_ids)
+    feeds.bump_versions(post_feeds)
+    bump_page_generation()
+    if created or instance._previous_group_ids != (instance.group_id,):
+        feeds.invalidate_counts(post_feeds)
+
+
+@receiver(post_save, sender=Post)
+def retain_post_files(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        storage.retain([instance.image.name])
+    elif instance._replaced_files is not None:
+        storage.retain([instance.image.name])
+        storage.release(instance._replaced_files)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_files(sender, instance, **kwargs):
+    storage.release(instance.files)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    post_feeds = feeds.post_feeds(instance)
+    feeds.bump_versions(post_feeds)
+    bump_page_generation()
+    feeds.invalidate_counts(post_feeds)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feeds(sender, instance, created=False, raw=False, **kwargs):
+    # Название группы выводится у постов во всех лентах.
+    if not created and not raw:
+        feeds.bump_versions([feeds.group_feed(instance.pk), feeds.ALL_FEEDS])
+        bump_page_generation()
+
+
+@receiver(post_save, sender=User)
+def bump_user_feeds(sender, instance, created, raw=False,
+                    update_fields=None, **kwargs):
+    if created or raw or (
+        update_fields and not set(update_fields) & USER_NAME_FIELDS
+    ):
+        return
+    feeds.bump_versions([feeds.author_feed(instance.pk), feeds.ALL_FEEDS])
+    bump_page_generation()
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+        bump_page_generation()
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+    bump_page_generation()
+
+
+def bump_follow_feeds(follow):
+    # Подписка меняет счётчики в профилях обоих и ленту подписок.
+    feeds.bump_versions([
+        feeds.author_feed(follow.user_id), feeds.author_feed(follow.author_id)
+    ])
+
+
+@receiver(post_save, sender=Follow)
+def add_followed_posts(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_stats(instance.user_id, following_count=1)
+        counters.change_user_stats(instance.author_id, followers_count=1)
+        timeline.add_author(instance.user_id, instance.author_id)
+        bump_follow_feeds(instance)
+        bump_page_generation()
+
+
+@receiver(post_delete, sender=Follow)
+def remove_unfollowed_posts(sender, instance, **kwargs):
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    bump_follow_feeds(instance)
+    bump_page_generation()
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.restore_triggers(connections[using])
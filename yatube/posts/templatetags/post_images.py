@@ -0,0 +1,65 @@
+from django import template
+from django.utils.html import format_html
+
+from ..settings import IMAGE_VARIANT_SIZES
+from ..variants import FALLBACK_FORMAT, MIME_TYPES
+
+register = template.Library()
+
+
+def image_attrs(post, lazy):
+    """Ленивая загрузка и заглушка на месте картинки до её загрузки.
+
+    width/height у <img> задают пропорции, поэтому с height: auto
+    место под картинку резервируется и вёрстка не прыгает.
+    """
+    style = 'height: auto;'
+    if post.image_placeholder:
+        style += (
+            ' background: center / cover no-repeat'
+            f" url('{post.image_placeholder}');"
+        )
+    if lazy:
+        return format_html(
+            ' loading="lazy" decoding="async" style="{}"', style
+        )
+    return format_html(' style="{}"', style)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(post, lazy=True):
+    """<picture> с вариантами картинки поста по форматам и ширинам.
+
+    Пока варианты не готовы, выводится миниатюра sorl.
+    """
+    context = {'post': post, 'attrs': image_attrs(post, lazy)}
+    variants = post.variants
+    if not variants:
+        return context
+    storage = post.image.storage
+    srcsets = {}
+    for variant in variants:
+        srcsets.setdefault(variant['format'], []).append(
+            f"{storage.url(variant['name'])} {variant['width']}w"
+        )
+    fallback = [
+        variant for variant in variants
+        if variant['format'] == FALLBACK_FORMAT
+    ]
+    # Атрибуты img - по самому широкому варианту, его пропорции общие.
+    image = max(fallback, key=lambda variant: variant['width'])
+    return {
+        **context,
+        'sources': [
+            {'type': MIME_TYPES[image_format], 'srcset': ', '.join(srcset)}
+            for image_format, srcset in srcsets.items()
+            if image_format != FALLBACK_FORMAT
+        ],
+        'image': {
+            'src': storage.url(image['name']),
+            'srcset': ', '.join(srcsets[FALLBACK_FORMAT]),
+            'width': image['width'],
+            'height': image['height'],
+        },
+        'sizes': IMAGE_VARIANT_SIZES,
+    }
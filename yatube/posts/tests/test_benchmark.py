@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from .. import benchmark, dataset, importer
+from ..models import Follow, Post, User
+
+POSTS_COUNT = 50
+SEED = 1
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        importer.load(dataset.records(POSTS_COUNT, SEED))
+
+    def test_dataset_is_deterministic(self):
+        self.assertEqual(
+            list(dataset.records(POSTS_COUNT, SEED)),
+            list(dataset.records(POSTS_COUNT, SEED)),
+        )
+        self.assertNotEqual(
+            list(dataset.records(POSTS_COUNT, SEED)),
+            list(dataset.records(POSTS_COUNT, SEED + 1)),
+        )
+        self.assertEqual(Post.objects.count(), POSTS_COUNT)
+        self.assertEqual(
+            User.objects.count(), POSTS_COUNT // dataset.POSTS_PER_USER
+        )
+        self.assertTrue(Follow.objects.exists())
+
+    def test_measure_all_pages(self):
+        results = benchmark.measure(repeat=2)
+        self.assertEqual(
+            [name for name, *_ in benchmark.requests()[1]], list(results)
+        )
+        for name, metrics in results.items():
+            with self.subTest(name=name):
+                self.assertGreater(metrics['queries'], 0)
+                self.assertGreater(metrics['memory_kb'], 0)
+                self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([5], 90), 5)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'10': {'posts:index': {
+            'p50_ms': 10, 'p90_ms': 20, 'queries': 3, 'memory_kb': 100,
+        }}}
+        results = {'10': {'posts:index': {
+            'p50_ms': 12, 'p90_ms': 40, 'queries': 4, 'memory_kb': 110,
+            'p99_ms': 1000,
+        }}}
+        self.assertEqual(benchmark.compare(results, baseline, 0.25), [
+            '10 posts:index p90_ms: 40 > 20',
+            '10 posts:index queries: 4 > 3',
+        ])
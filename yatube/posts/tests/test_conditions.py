@@ -0,0 +1,185 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import parse_http_date
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тестовое описание'
+POST_TEXT = 'Тестовый текст'
+NEW_POST_TEXT = 'Редактированный текст'
+COMMENT = 'Тестовый комментарий'
+OTHER_USERNAME = 'OtherUser'
+OTHER_SLUG = 'other-slug'
+
+INDEX_URL = reverse('posts:index')
+GROUP_LIST_URL = reverse('posts:group_list', args=[GROUP_SLUG])
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+FOLLOW_URL = reverse('posts:follow_index')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            text=POST_TEXT,
+            author=cls.author_user,
+            group=cls.group,
+        )
+        cls.POST_DETAIL_URL = reverse('posts:post_detail', args=[cls.post.id])
+        cls.POST_EDIT_URL = reverse('posts:post_edit', args=[cls.post.id])
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.author_user)
+        cls.other_user = User.objects.create_user(username=OTHER_USERNAME)
+        cls.other_group = Group.objects.create(
+            title=GROUP_TITLE, slug=OTHER_SLUG,
+        )
+        cls.other_post = Post.objects.create(
+            text=POST_TEXT, author=cls.other_user, group=cls.other_group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, client, url):
+        response = client.get(url)
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def validators(self, client, url):
+        # Браузер присылает оба валидатора.
+        response = client.get(url)
+        return {
+            'HTTP_IF_NONE_MATCH': response['ETag'],
+            'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+        }
+
+    def test_unchanged_pages_return_not_modified(self):
+        urls_clients = [
+            [INDEX_URL, self.guest],
+            [GROUP_LIST_URL, self.guest],
+            [PROFILE_URL, self.guest],
+            [self.POST_DETAIL_URL, self.guest],
+            [FOLLOW_URL, self.author],
+        ]
+        for url, client in urls_clients:
+            with self.subTest(url=url):
+                response = self.revalidate(client, url)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_pages_are_revalidated_on_every_request(self):
+        self.assertIn('no-cache', self.guest.get(INDEX_URL)['Cache-Control'])
+        self.assertIn('private', self.author.get(INDEX_URL)['Cache-Control'])
+
+    def test_etag_depends_on_user(self):
+        self.assertNotEqual(self.guest.get(INDEX_URL)['ETag'],
+                            self.author.get(INDEX_URL)['ETag'])
+
+    def test_edit_changes_validators(self):
+        response = self.guest.get(self.POST_DETAIL_URL)
+        self.author.post(self.POST_EDIT_URL, {'text': NEW_POST_TEXT})
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, self.post.created)
+        self.assertEqual(self.guest.get(
+            self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, HTTPStatus.OK)
+
+    def test_post_last_modified_includes_comments(self):
+        comment = Comment.objects.create(
+            text=COMMENT, post=self.post, author=self.author_user
+        )
+        response = self.guest.get(self.POST_DETAIL_URL)
+        self.assertGreaterEqual(parse_http_date(response['Last-Modified']),
+                                int(comment.created.timestamp()))
+        self.assertEqual(self.guest.get(
+            self.POST_DETAIL_URL,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        ).status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_replaced_comment_changes_etag(self):
+        comment = Comment.objects.create(
+            text=COMMENT, post=self.post, author=self.author_user
+        )
+        response = self.guest.get(self.POST_DETAIL_URL)
+        comment.delete()
+        Comment.objects.create(
+            text=NEW_POST_TEXT, post=self.post, author=self.other_user
+        )
+        self.assertEqual(self.guest.get(
+            self.POST_DETAIL_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, HTTPStatus.OK)
+
+    def test_unrelated_activity_keeps_validators(self):
+        urls = [GROUP_LIST_URL, PROFILE_URL, self.POST_DETAIL_URL]
+        validators = {url: self.validators(self.guest, url) for url in urls}
+        Post.objects.create(
+            text=POST_TEXT, author=self.other_user, group=self.other_group
+        )
+        Comment.objects.create(
+            text=COMMENT, post=self.other_post, author=self.other_user
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest.get(url, **validators[url]).status_code,
+                    HTTPStatus.NOT_MODIFIED,
+                )
+
+    def test_follow_feed_changes_with_followed_authors(self):
+        Follow.objects.create(user=self.author_user, author=self.other_user)
+        response = self.author.get(FOLLOW_URL)
+        Post.objects.create(text=POST_TEXT, author=self.other_user)
+        self.assertEqual(self.author.get(
+            FOLLOW_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, HTTPStatus.OK)
+
+    def test_follow_changes_profile_validators(self):
+        response = self.author.get(PROFILE_URL)
+        Follow.objects.create(user=self.other_user, author=self.author_user)
+        self.assertEqual(self.author.get(
+            PROFILE_URL, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, HTTPStatus.OK)
+
+    def test_last_modified_changes_with_feeds(self):
+        post = Post.objects.create(text=POST_TEXT, author=self.other_user)
+        for url, change in [
+            [PROFILE_URL, lambda: Follow.objects.create(
+                user=self.other_user, author=self.author_user
+            )],
+            [INDEX_URL, post.delete],
+            [GROUP_LIST_URL, lambda: Group.objects.filter(
+                pk=self.other_group.pk
+            ).get().save()],
+        ]:
+            with self.subTest(url=url):
+                last_modified = self.guest.get(url)['Last-Modified']
+                # Время смены поколения - в следующей секунде.
+                with mock.patch('posts.feeds.time.time',
+                                return_value=time.time() + 1):
+                    change()
+                self.assertEqual(self.guest.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                ).status_code, HTTPStatus.OK)
+
+    def test_missing_objects_have_no_etag(self):
+        response = self.guest.get(
+            reverse('posts:group_list', args=['missing'])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
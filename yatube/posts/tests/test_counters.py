@@ -0,0 +1,74 @@
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+USER_USERNAME = 'TestUser'
+POST_TEXT = 'Тестовый текст'
+COMMENT = 'Тестовый комментарий'
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_new_user_gets_stats(self):
+        stats = self.stats(self.author)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(stats.following_count, 0)
+
+    def test_posts_count(self):
+        post = Post.objects.create(text=POST_TEXT, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comments_count(self):
+        post = Post.objects.create(text=POST_TEXT, author=self.author)
+        comment = Comment.objects.create(
+            text=COMMENT, post=post, author=self.user
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counts(self):
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.user).following_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_cascade_delete_updates_counters(self):
+        author = User.objects.create_user(username='Temporary')
+        post = Post.objects.create(text=POST_TEXT, author=self.author)
+        Comment.objects.create(text=COMMENT, post=post, author=author)
+        Follow.objects.create(user=self.user, author=author)
+        author.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_recount_command_fixes_drift(self):
+        Post.objects.bulk_create([
+            Post(text=POST_TEXT, author=self.author) for _ in range(3)
+        ])
+        UserStats.objects.filter(user=self.user).delete()
+        Follow.objects.bulk_create([Follow(user=self.user,
+                                           author=self.author)])
+        call_command('recount')
+        self.assertEqual(self.stats(self.author).posts_count, 3)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
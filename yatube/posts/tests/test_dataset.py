@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+from io import StringIO
+from random import Random
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from core.storage import is_immutable
+from .. import dataset
+from ..models import Post
+
+POSTS_COUNT = 20
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDatasetTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def generate(self, **options):
+        call_command(
+            'generate_dataset', posts=POSTS_COUNT, workers=1,
+            stdout=StringIO(), **options
+        )
+
+    def test_generate_dataset_with_images(self):
+        self.generate(images=0.5, seed=3)
+        posts = Post.objects.exclude(image='')
+        self.assertTrue(posts.exists())
+        for post in posts:
+            with self.subTest(post=post.pk):
+                self.assertTrue(is_immutable(post.image.name))
+                self.assertTrue(post.image.storage.exists(post.image.name))
+        with self.assertRaises(CommandError):
+            self.generate()
+
+    def test_images_depend_only_on_seed_and_number(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        contents = []
+        for _ in range(2):
+            with open(dataset.synthesize(1, 7, directory), 'rb') as image:
+                contents.append(image.read())
+        self.assertEqual(contents[0], contents[1])
+
+    def test_timestamps_are_ordered_and_bursty(self):
+        count = 5000
+        uniform = dataset.timestamps(count, Random(0), burst_alpha=0)
+        bursty = dataset.timestamps(count, Random(0))
+        for moments in [uniform, bursty]:
+            self.assertEqual(moments, sorted(moments))
+            self.assertGreaterEqual(moments[0], dataset.START)
+            self.assertLessEqual(moments[-1], dataset.START + dataset.PERIOD)
+
+        def longest_gap(moments):
+            return max(
+                later - earlier for earlier, later in zip(moments, moments[1:])
+            )
+        self.assertGreater(longest_gap(bursty), 10 * longest_gap(uniform))
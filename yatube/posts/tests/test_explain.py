@@ -0,0 +1,88 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..settings import POSTS_PER_PAGE
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+USER_USERNAME = 'TestUser'
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тестовое описание'
+COMMENT = 'Тестовый комментарий'
+
+INDEX_URL = reverse('posts:index')
+GROUP_LIST_URL = reverse('posts:group_list', args=[GROUP_SLUG])
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+FOLLOW_URL = reverse('posts:follow_index')
+
+# Полный проход по таблице (не по индексу) или сортировка во временном
+# B-дереве; поддерживаются форматы SQLite до и после 3.36. Проход по
+# подзапросу ограниченного COUNT(*) - это не таблица и разрешён.
+BAD_PLAN = re.compile(
+    r'^SCAN (TABLE )?(?!subquery\b)\w+( AS \w+)?$|USE TEMP B-TREE'
+)
+
+
+class ExplainQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.user, author=cls.author_user)
+        for i in range(POSTS_PER_PAGE + 1):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.author_user,
+                group=cls.group,
+            )
+            Comment.objects.create(
+                text=COMMENT, post=cls.post, author=cls.user
+            )
+        cls.POST_DETAIL_URL = reverse('posts:post_detail',
+                                      args=[cls.post.id])
+        cls.guest = Client()
+        cls.another = Client()
+        cls.another.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def query_plans(self, client, url, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            client.get(url, data)
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def test_views_use_indexes(self):
+        for url in [INDEX_URL, GROUP_LIST_URL, PROFILE_URL, FOLLOW_URL,
+                    self.POST_DETAIL_URL]:
+            first_page = self.another.get(url).context.get('page_obj')
+            pages = [None]
+            if first_page is not None:
+                pages.append({'after': first_page.next_cursor})
+            for data in pages:
+                for sql, plan in self.query_plans(self.another, url, data):
+                    with self.subTest(url=url, data=data, sql=sql):
+                        self.assertFalse(
+                            [row for row in plan if BAD_PLAN.search(row)],
+                            '\n'.join(plan)
+                        )
@@ -0,0 +1,108 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+AUTHOR_USERNAME = 'TestAuthor'
+ANOTHER_USERNAME = 'AnotherAuthor'
+GROUP_SLUG = 'test-slug'
+POST_TEXT = 'Текст с "кавычками", запятой\nи переводом строки'
+COMMENT_TEXT = 'Комментарий'
+EXPORT_URL = reverse('posts:export')
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.another = User.objects.create_user(username=ANOTHER_USERNAME)
+        cls.group = Group.objects.create(
+            title='Группа', slug=GROUP_SLUG, description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text=POST_TEXT, author=cls.author, group=cls.group
+        )
+        Post.objects.create(text='Чужой пост', author=cls.another)
+        Comment.objects.create(
+            text=COMMENT_TEXT, post=cls.post, author=cls.another
+        )
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.staff_client = Client()
+        cls.staff_client.force_login(cls.staff)
+        cls.user_client = Client()
+        cls.user_client.force_login(cls.author)
+        cls.target = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.target, ignore_errors=True)
+        super().tearDownClass()
+
+    def export(self, **options):
+        stdout = StringIO()
+        call_command('export_yatube', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_ndjson_export_by_group(self):
+        records = [
+            json.loads(line)
+            for line in self.export(group=GROUP_SLUG).splitlines()
+        ]
+        self.assertEqual(
+            [(record['type'], record['text']) for record in records],
+            [('post', POST_TEXT), ('comment', COMMENT_TEXT)],
+        )
+        self.assertEqual(records[0]['author'], AUTHOR_USERNAME)
+        self.assertEqual(records[0]['group'], GROUP_SLUG)
+        self.assertEqual(records[1]['post'], self.post.pk)
+        self.assertEqual(records[1]['author'], ANOTHER_USERNAME)
+
+    def test_gzipped_csv_export_by_author(self):
+        path = os.path.join(self.target, 'posts.csv.gz')
+        self.export(
+            author=ANOTHER_USERNAME, export_format='csv', comments=False,
+            output=path,
+        )
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as source:
+            rows = list(csv.DictReader(source))
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Чужой пост')],
+        )
+
+    def test_export_can_be_imported(self):
+        path = os.path.join(self.target, 'dump.csv')
+        self.export(export_format='csv', output=path)
+        Post.objects.all().delete()
+        call_command(
+            'import_yatube', path, stdout=StringIO(), stderr=StringIO()
+        )
+        post = Post.objects.get(text=POST_TEXT)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.created, self.post.created)
+        self.assertEqual(post.comments.get().text, COMMENT_TEXT)
+
+    def test_export_view_is_staff_only_and_gzipped(self):
+        self.assertEqual(self.user_client.get(EXPORT_URL).status_code, 302)
+        response = self.staff_client.get(EXPORT_URL, {'author': 'nobody'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), b''
+        )
+        response = self.staff_client.get(EXPORT_URL, {'group': GROUP_SLUG})
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['text'], POST_TEXT)
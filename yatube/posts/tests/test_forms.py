@@ -1,13 +1,20 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from core.storage import is_immutable
+from .. import images
 from ..models import Comment, Group, Post, User
+from ..settings import IMAGE_MASTER_SIZE
 
 
 AUTHOR_USERNAME = 'TestAuthor'
@@ -30,6 +37,9 @@ SMALL_GIF = (
     b'\x0A\x00\x3B'
 )
 COMMENT = 'Тестовый комментарий'
+EXIF_MAKE = 0x010F
+EXIF_ORIENTATION = 0x0112
+ROTATED_RIGHT = 6
 IMAGE_UPLOAD_TO = Post._meta.get_field('image').upload_to
 
 PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
@@ -75,6 +85,14 @@ class PostCreateFormTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def assertStoredImage(self, post, uploaded):
+        # Имя файла - хеш содержимого, расширение - от загрузки.
+        self.assertTrue(post.image.name.startswith(IMAGE_UPLOAD_TO))
+        self.assertTrue(post.image.name.endswith(
+            os.path.splitext(uploaded.name)[1]
+        ))
+        self.assertTrue(is_immutable(post.image.name))
+
     def test_create_post(self):
         Post.objects.all().delete()
         uploaded = SimpleUploadedFile(
@@ -97,7 +115,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.author, self.author_user)
-        self.assertEqual(post.image, IMAGE_UPLOAD_TO + form_data['image'].name)
+        self.assertStoredImage(post, form_data['image'])
         self.assertRedirects(response, PROFILE_URL)
 
     def test_edit_post(self):
@@ -123,7 +141,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.id, form_data['group'])
         self.assertEqual(post.author, self.post.author)
-        self.assertEqual(post.image, IMAGE_UPLOAD_TO + form_data['image'].name)
+        self.assertStoredImage(post, form_data['image'])
 
     def test_create_edit_pages_show_correct_context(self):
         urls = [POST_CREATE_URL, self.POST_EDIT_URL]
@@ -219,3 +237,100 @@ class PostCreateFormTests(TestCase):
                 self.assertEqual(post.group.id, self.post.group.id)
                 self.assertEqual(post.author, self.post.author)
                 self.assertEqual(post.image, self.post.image)
+
+
+def photo_upload(name, size, orientation=None, image_format='JPEG'):
+    exif = Image.Exif()
+    exif[EXIF_MAKE] = 'Test camera'
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    buffer = BytesIO()
+    image = Image.new('RGB', size, (0, 128, 255))
+    if image_format == 'GIF':
+        # В GIF нет EXIF, метаданные - комментарий.
+        image.save(buffer, 'GIF', comment=b'Test camera')
+    else:
+        image.save(buffer, image_format, exif=exif.tobytes())
+    return SimpleUploadedFile(name=name, content=buffer.getvalue())
+
+
+def image_upload(name, mode, image_format):
+    buffer = BytesIO()
+    Image.new(mode, (20, 10)).save(buffer, image_format)
+    return SimpleUploadedFile(name=name, content=buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.author = Client()
+        cls.author.force_login(cls.author_user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, image):
+        return self.author.post(POST_CREATE_URL, {
+            'text': POST_TEXT_1, 'image': image,
+        })
+
+    def test_image_is_rotated_downscaled_and_stripped(self):
+        rotated = (IMAGE_MASTER_SIZE // 4, IMAGE_MASTER_SIZE)
+        for image_format, orientation, size in [
+            ['JPEG', ROTATED_RIGHT, rotated],
+            ['PNG', ROTATED_RIGHT, rotated],
+            ['GIF', None, (IMAGE_MASTER_SIZE, IMAGE_MASTER_SIZE // 4)],
+        ]:
+            upload = photo_upload(
+                f'photo.{image_format.lower()}', (4000, 1000),
+                orientation, image_format,
+            )
+            with self.subTest(name=upload.name):
+                self.create(upload)
+                post = Post.objects.latest('pk')
+                with post.image.open() as file, Image.open(file) as image:
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, size)
+                    self.assertEqual(len(image.getexif()), 0)
+                    self.assertNotIn('comment', image.info)
+
+    def test_other_formats_are_converted(self):
+        for upload, image_format in [
+            [image_upload('photo.bmp', 'RGB', 'BMP'), 'JPEG'],
+            [image_upload('logo.tiff', 'RGBA', 'TIFF'), 'PNG'],
+        ]:
+            with self.subTest(name=upload.name):
+                self.create(upload)
+                post = Post.objects.latest('pk')
+                with post.image.open() as file, Image.open(file) as image:
+                    self.assertEqual(image.format, image_format)
+
+    def test_mpo_is_saved_as_jpeg(self):
+        # Pillow этой версии не записывает MPO, поэтому формат
+        # подставляется в открытую картинку.
+        image = Image.new('RGB', (20, 10))
+        image.format = 'MPO'
+        self.assertEqual(images._master_format(image), 'JPEG')
+
+    def test_too_many_pixels_are_rejected(self):
+        with mock.patch('posts.forms.IMAGE_MAX_PIXELS', 100):
+            response = self.create(photo_upload('photo.jpg', (20, 10)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое изображение: 0 Мп, допустимо не больше 0 Мп.',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_large_file_is_rejected(self):
+        image = photo_upload('photo.jpg', (200, 200))
+        with override_settings(UPLOAD_MAX_FILE_SIZE=image.size - 1):
+            response = self.create(image)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл слишком большой.'
+        )
+        self.assertFalse(Post.objects.exists())
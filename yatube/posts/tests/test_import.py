@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import is_immutable
+from ..models import Comment, Follow, Post, TimelineEntry, User
+from ..search import SearchPaginator, build_query
+from ..settings import POSTS_PER_PAGE
+
+AUTHOR_USERNAME = 'TestAuthor'
+USER_USERNAME = 'TestUser'
+GROUP_SLUG = 'test-slug'
+POST_CREATED = '2020-01-02T03:04:05+00:00'
+IMAGE_NAME = 'legacy.gif'
+IMAGE_CONTENT = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B'
+)
+RECORDS = [
+    {'type': 'user', 'username': AUTHOR_USERNAME, 'first_name': 'Иван'},
+    {'type': 'user', 'username': USER_USERNAME},
+    {'type': 'group', 'slug': GROUP_SLUG, 'title': 'Группа'},
+    {'type': 'post', 'id': 7, 'author': AUTHOR_USERNAME,
+     'group': GROUP_SLUG, 'text': 'Старый пост про ежей',
+     'created': POST_CREATED, 'image': IMAGE_NAME},
+    {'type': 'comment', 'post': 7, 'author': USER_USERNAME,
+     'text': 'Комментарий'},
+    {'type': 'follow', 'user': USER_USERNAME, 'author': AUTHOR_USERNAME},
+    {'type': 'comment', 'post': 999, 'author': USER_USERNAME,
+     'text': 'К неизвестному посту'},
+    {'type': 'post', 'author': 'nobody', 'text': 'Неизвестный автор'},
+]
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+# Временные ссылки save() хранилища снимаются после коммита.
+@mock.patch('core.storage.transaction.on_commit', lambda func: func())
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        with open(os.path.join(cls.source, IMAGE_NAME), 'wb') as image:
+            image.write(IMAGE_CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.source, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(content)
+        return path
+
+    def import_files(self, *paths, **options):
+        stdout = StringIO()
+        call_command(
+            'import_yatube', *paths, media_dir=self.source,
+            batch_size=2, stdout=stdout, stderr=StringIO(), **options
+        )
+        return stdout.getvalue()
+
+    def test_jsonl_import(self):
+        output = self.import_files(self.write('dump.jsonl', '\n'.join(
+            json.dumps(record, ensure_ascii=False) for record in RECORDS
+        )))
+        self.assertIn('пропущено: 2', output)
+        # Группа поста ещё в невставленной пачке - она вставляется
+        # раньше поста.
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.author.username, AUTHOR_USERNAME)
+        self.assertEqual(post.group.slug, GROUP_SLUG)
+        self.assertEqual(post.created.isoformat(), POST_CREATED)
+        self.assertEqual(post.updated, post.created)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertTrue(is_immutable(post.image.name))
+        self.assertEqual(
+            StoredFile.objects.get(name=post.image.name).references, 1
+        )
+        follower = User.objects.get(username=USER_USERNAME)
+        self.assertFalse(follower.has_usable_password())
+        self.assertEqual(follower.stats.following_count, 1)
+        self.assertEqual(post.author.stats.posts_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=follower, post=post).exists()
+        )
+        self.assertEqual(
+            list(SearchPaginator(
+                build_query('ежей'), POSTS_PER_PAGE
+            ).get_page()),
+            [post],
+        )
+        new_post = Post.objects.create(text='Новый пост', author=follower)
+        self.assertGreater(new_post.pk, post.pk)
+        self.assertEqual(
+            list(SearchPaginator(
+                build_query('новый'), POSTS_PER_PAGE
+            ).get_page()),
+            [new_post],
+        )
+
+    def test_csv_import(self):
+        users = self.write(
+            'users.csv', f'username,first_name\n{AUTHOR_USERNAME},Иван\n'
+            f'{USER_USERNAME},\n'
+        )
+        follows = self.write(
+            'follows.csv', f'user,author\n{USER_USERNAME},{AUTHOR_USERNAME}\n'
+        )
+        self.import_files(users, type='user')
+        self.import_files(follows, type='follow')
+        self.assertEqual(
+            User.objects.get(username=AUTHOR_USERNAME).first_name, 'Иван'
+        )
+        self.assertTrue(Follow.objects.filter(
+            user__username=USER_USERNAME, author__username=AUTHOR_USERNAME
+        ).exists())
+        # Повторный импорт не создаёт дублей.
+        self.import_files(users, type='user')
+        self.import_files(follows, type='follow')
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Follow.objects.count(), 1)
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..settings import POSTS_PER_PAGE
+from .utils import QueryBudgetMixin
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+USER_USERNAME = 'TestUser'
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тестовое описание'
+LARGE_PAGE = 5 * POSTS_PER_PAGE
+
+INDEX_URL = reverse('posts:index')
+GROUP_LIST_URL = reverse('posts:group_list', args=[GROUP_SLUG])
+PROFILE_URL = reverse('posts:profile', args=[AUTHOR_USERNAME])
+FOLLOW_URL = reverse('posts:follow_index')
+
+
+class PostsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        posts = Post.objects.bulk_create([
+            Post(
+                text=f'Тестовый текст {i}',
+                author=cls.author_user,
+                group=cls.group,
+            ) for i in range(LARGE_PAGE + 1)
+        ])
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        Follow.objects.create(user=cls.user, author=cls.author_user)
+        cls.post = Post.objects.filter(group=cls.group).first()
+        Comment.objects.bulk_create([
+            Comment(
+                text=f'Комментарий {i}',
+                post=cls.post,
+                author=cls.user,
+            ) for i in range(len(posts))
+        ])
+        cls.guest = Client()
+        cls.another = Client()
+        cls.another.force_login(cls.user)
+        cls.POST_DETAIL_URL = reverse('posts:post_detail',
+                                      args=[cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+
+    def budgets(self):
+        # Сессия и пользователь добавляют авторизованному клиенту 2 запроса,
+        # промах кэша числа записей в ленте и поиск группы или автора для
+        # валидаторов - ещё по одному, ETag ленты подписок - промах кэша
+        # списка подписок.
+        return [
+            [INDEX_URL, self.guest, 2],
+            [GROUP_LIST_URL, self.guest, 4],
+            [PROFILE_URL, self.guest, 4],
+            [self.POST_DETAIL_URL, self.guest, 3],
+            [INDEX_URL, self.another, 4],
+            [GROUP_LIST_URL, self.another, 6],
+            [PROFILE_URL, self.another, 7],
+            [self.POST_DETAIL_URL, self.another, 5],
+            [FOLLOW_URL, self.another, 5],
+        ]
+
+    def test_views_fit_query_budget(self):
+        for url, client, budget in self.budgets():
+            with self.subTest(url=url, client=client):
+                self.assertQueryBudget(client, url, budget)
+
+    def test_query_budget_does_not_depend_on_page_size(self):
+        with mock.patch('posts.views.POSTS_PER_PAGE', LARGE_PAGE):
+            for url, client, budget in self.budgets():
+                with self.subTest(url=url, client=client):
+                    self.assertQueryBudget(client, url, budget)
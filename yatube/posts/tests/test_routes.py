@@ -21,6 +21,7 @@ class PostsRoutesTests(TestCase):
             [f'/posts/{POST_ID}/edit/', 'post_edit', [POST_ID]],
             [f'/posts/{POST_ID}/comment/', 'add_comment', [POST_ID]],
             ['/follow/', 'follow_index', None],
+            ['/export/', 'export', None],
             [f'/profile/{USERNAME}/follow/', 'profile_follow', [USERNAME]],
             [f'/profile/{USERNAME}/unfollow/', 'profile_unfollow', [USERNAME]],
         ]
@@ -0,0 +1,103 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import FTS_TABLE, SearchPaginator, build_query, highlight
+from ..settings import POSTS_PER_PAGE
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+SEARCH_URL = reverse('posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.post = Post.objects.create(
+            text='Ёжик в тумане искал <лошадку>',
+            author=cls.author,
+        )
+
+    def search(self, text):
+        return list(
+            SearchPaginator(build_query(text), POSTS_PER_PAGE).get_page()
+        )
+
+    def test_build_query(self):
+        self.assertEqual(build_query('Ёжик, "туман"'), '"Ёжик"* "туман"*')
+        self.assertEqual(build_query(' ** '), '')
+
+    def test_prefix_and_case_insensitive_match(self):
+        for text in ['ЁЖИК', 'туман иск', 'лошад']:
+            with self.subTest(text=text):
+                self.assertEqual(self.search(text), [self.post])
+        self.assertEqual(self.search('туманный'), [])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        post = self.search('лошадку')[0]
+        self.assertIn('&lt;<mark>лошадку</mark>&gt;', post.snippet)
+        self.assertEqual(
+            highlight('<b>\x02x\x03</b>'),
+            '&lt;b&gt;<mark>x</mark>&lt;/b&gt;',
+        )
+
+    def test_triggers_follow_post_changes(self):
+        post = Post.objects.create(text='Первое слово', author=self.author)
+        self.assertEqual(self.search('первое'), [post])
+        Post.objects.filter(pk=post.pk).update(text='Второе слово')
+        self.assertEqual(self.search('первое'), [])
+        self.assertEqual(self.search('второе'), [post])
+        post.delete()
+        self.assertEqual(self.search('второе'), [])
+
+    def test_cursor_pagination(self):
+        Post.objects.bulk_create([
+            Post(text=f'Страница {i}', author=self.author)
+            for i in range(POSTS_PER_PAGE + 3)
+        ])
+        paginator = SearchPaginator(build_query('страница'), POSTS_PER_PAGE)
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor)
+        self.assertEqual(len(first), POSTS_PER_PAGE)
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            {post.pk for post in list(first) + list(second)},
+            set(Post.objects.filter(
+                text__startswith='Страница'
+            ).values_list('pk', flat=True)),
+        )
+        back = paginator.get_page(before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_search_page(self):
+        response = self.client.get(SEARCH_URL, {'q': 'ёжик'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertContains(response, '<mark>Ёжик</mark>')
+        response = self.client.get(SEARCH_URL)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'туман'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
+
+    def test_rebuild_search_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+            )
+        self.assertEqual(self.search('ёжик'), [])
+        call_command('rebuild_search_index')
+        self.assertEqual(self.search('ёжик'), [self.post])
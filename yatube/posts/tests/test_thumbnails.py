@@ -0,0 +1,252 @@
+import base64
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails, variants
+from ..models import Post, User
+from ..settings import (
+    IMAGE_PLACEHOLDER_WIDTH, IMAGE_VARIANT_WIDTHS, POST_THUMBNAILS,
+)
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+POST_TEXT = 'Тестовый текст'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+POST_CREATE_URL = reverse('posts:post_create')
+INDEX_URL = reverse('posts:index')
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded(name):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+def uploaded_png(name, size, color=(255, 0, 0)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/png'
+    )
+
+
+def run_on_commit():
+    return mock.patch.object(
+        thumbnails.transaction, 'on_commit', side_effect=lambda func: func()
+    )
+
+
+# Фоновый поток блокирует тестовую базу SQLite в памяти целиком.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAILS_SYNC=True)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_posts(self, count):
+        # Разные картинки: одинаковые хранилище сохранило бы одним файлом.
+        return [
+            Post.objects.create(
+                text=POST_TEXT, author=self.author,
+                image=uploaded_png(f'post{i}.png', (40, 20), (255, 0, i)),
+            ) for i in range(count)
+        ]
+
+    def test_generate_creates_thumbnails(self):
+        post, = self.create_posts(1)
+        thumbnails.generate(post.image.name)
+        for geometry, options in POST_THUMBNAILS:
+            with self.subTest(geometry=geometry):
+                thumbnail = thumbnails.get_thumbnail(
+                    post.image.name, geometry, **options
+                )
+                self.assertTrue(thumbnail.exists())
+
+    def test_post_create_schedules_thumbnails(self):
+        self.client.force_login(self.author)
+        with mock.patch.object(thumbnails, '_submit') as submit, \
+                run_on_commit():
+            self.client.post(POST_CREATE_URL, {
+                'text': POST_TEXT, 'image': uploaded('small.gif'),
+            })
+        post = Post.objects.get()
+        submit.assert_called_once_with(post.pk, post.image.name)
+
+    def test_sync_prepare_runs_after_commit(self):
+        self.client.force_login(self.author)
+        with run_on_commit():
+            self.client.post(POST_CREATE_URL, {
+                'text': POST_TEXT, 'image': uploaded_png('wide.png', (40, 20)),
+            })
+        post = Post.objects.get()
+        self.assertNotEqual(post.variants, [])
+        geometry, options = POST_THUMBNAILS[0]
+        self.assertTrue(thumbnails.get_thumbnail(
+            post.image.name, geometry, **options
+        ).exists())
+
+    @override_settings(THUMBNAILS_SYNC=False)
+    def test_prepare_runs_in_executor(self):
+        prepared = threading.Event()
+        threads = []
+
+        def prepare(post_id, name):
+            threads.append(threading.current_thread().name)
+            prepared.set()
+
+        with mock.patch.object(thumbnails, 'prepare', side_effect=prepare):
+            thumbnails._submit(1, 'posts/small.gif')
+            self.assertTrue(prepared.wait(5))
+        self.assertTrue(threads[0].startswith('thumbnails'))
+
+    def test_rebuild_thumbnails_resumes(self):
+        posts = self.create_posts(3)
+        state_file = os.path.join(TEMP_MEDIA_ROOT, 'state')
+        with open(state_file, 'w') as state:
+            state.write(str(posts[0].pk))
+        with mock.patch.object(thumbnails, 'generate') as generate:
+            call_command(
+                'rebuild_thumbnails', workers=1, resume=True,
+                state_file=state_file, stdout=StringIO(),
+            )
+        self.assertEqual(
+            [call.args[0] for call in generate.call_args_list],
+            [post.image.name for post in posts[1:]],
+        )
+        self.assertFalse(os.path.exists(state_file))
+
+    def test_variants_are_built_once_and_rendered(self):
+        post = Post.objects.create(
+            text=POST_TEXT, author=self.author,
+            image=uploaded_png('wide.png', (1000, 400)),
+        )
+        variants.build(post.pk)
+        post.refresh_from_db()
+        widths = [width for width in IMAGE_VARIANT_WIDTHS if width <= 1000]
+        formats = variants.supported_formats()
+        self.assertIn(variants.FALLBACK_FORMAT, formats)
+        self.assertEqual(
+            sorted((v['format'], v['width']) for v in post.variants),
+            sorted((f, w) for w in widths for f in formats),
+        )
+        storage = post.image.storage
+        for variant in post.variants:
+            with self.subTest(variant=variant):
+                self.assertEqual(
+                    (variant['width'], variant['height']),
+                    variants.variant_size(variant['width']),
+                )
+                with storage.open(variant['name']) as file:
+                    self.assertEqual(
+                        Image.open(file).size,
+                        (variant['width'], variant['height']),
+                    )
+        with mock.patch.object(
+            FileSystemStorage, 'exists', side_effect=AssertionError
+        ), mock.patch.object(
+            FileSystemStorage, 'size', side_effect=AssertionError
+        ):
+            html = Template(
+                '{% load post_images %}{% picture post %}'
+            ).render(Context({'post': post}))
+        self.assertIn('<picture>', html)
+        self.assertIn(storage.url(post.variants[0]['name']), html)
+        self.assertIn('width="960" height="339"', html)
+
+    def test_placeholder_is_inlined_with_lazy_loading(self):
+        post = Post.objects.create(
+            text=POST_TEXT, author=self.author,
+            image=uploaded_png('wide.png', (1000, 400)),
+        )
+        variants.build(post.pk)
+        post.refresh_from_db()
+        prefix = 'data:image/jpeg;base64,'
+        self.assertTrue(post.image_placeholder.startswith(prefix))
+        with Image.open(BytesIO(base64.b64decode(
+            post.image_placeholder[len(prefix):]
+        ))) as tiny:
+            self.assertEqual(tiny.size, variants.variant_size(
+                IMAGE_PLACEHOLDER_WIDTH
+            ))
+        response = self.client.get(INDEX_URL)
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, post.image_placeholder)
+        detail = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(detail, post.image_placeholder)
+        self.assertNotContains(detail, 'loading="lazy"')
+
+    def test_new_image_drops_variants(self):
+        post = Post.objects.create(
+            text=POST_TEXT, author=self.author,
+            image=uploaded_png('first.png', (500, 200)),
+        )
+        variants.build(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.variants)
+        post.image = uploaded('small.gif')
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.variants, [])
+        self.assertEqual(post.image_placeholder, '')
+
+    def test_feed_looks_up_thumbnails_in_one_query(self):
+        posts = self.create_posts(3)
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        no_stat = mock.patch.object(
+            FileSystemStorage, 'exists', side_effect=AssertionError
+        )
+        with CaptureQueriesContext(connection) as queries, no_stat:
+            response = self.client.get(INDEX_URL)
+        self.assertEqual(len([
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]), 1)
+        geometry, options = POST_THUMBNAILS[0]
+        urls = set()
+        for post in posts:
+            with self.subTest(post=post):
+                thumbnail = thumbnails.get_thumbnail(
+                    post.image.name, geometry, **options
+                )
+                self.assertContains(
+                    response,
+                    f'src="{thumbnail.url}" width="{thumbnail.width}"',
+                )
+                urls.add(thumbnail.url)
+        self.assertEqual(len(urls), len(posts))
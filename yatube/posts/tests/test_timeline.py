@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User, UserStats
+from ..settings import POPULAR_AUTHORS_CACHE_KEY
+
+
+AUTHOR_USERNAME = 'TestAuthor'
+POPULAR_USERNAME = 'PopularAuthor'
+USER_USERNAME = 'TestUser'
+POST_TEXT = 'Тестовый текст'
+POPULAR_POST_TEXT = 'Пост популярного автора'
+
+FOLLOW_URL = reverse('posts:follow_index')
+PROFILE_UNFOLLOW_URL = reverse('posts:profile_unfollow',
+                               args=[AUTHOR_USERNAME])
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.popular_user = User.objects.create_user(
+            username=POPULAR_USERNAME
+        )
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.another = Client()
+        cls.another.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        Follow.objects.create(user=self.user, author=self.author_user)
+
+    def feed(self):
+        return list(self.another.get(FOLLOW_URL).context['page_obj'])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        post = Post.objects.create(text=POST_TEXT, author=self.author_user)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post, created=post.created
+        ).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_adds_existing_posts_to_timeline(self):
+        Follow.objects.all().delete()
+        post = Post.objects.create(text=POST_TEXT, author=self.author_user)
+        self.assertEqual(self.feed(), [])
+        Follow.objects.create(user=self.user, author=self.author_user)
+        self.assertEqual(self.feed(), [post])
+
+    def test_unfollow_removes_posts_from_timeline(self):
+        Post.objects.create(text=POST_TEXT, author=self.author_user)
+        self.another.get(PROFILE_UNFOLLOW_URL)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 0)
+    def test_popular_author_posts_are_merged_on_read(self):
+        # Подписка в setUp закэшировала популярных при настоящем лимите.
+        cache.delete(POPULAR_AUTHORS_CACHE_KEY)
+        Follow.objects.create(user=self.user, author=self.popular_user)
+        post = Post.objects.create(text=POST_TEXT, author=self.author_user)
+        popular_post = Post.objects.create(
+            text=POPULAR_POST_TEXT, author=self.popular_user
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [popular_post, post])
+
+    def test_popular_posts_stay_after_limit_is_raised(self):
+        with mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 0):
+            post = Post.objects.create(
+                text=POST_TEXT, author=self.author_user
+            )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 1)
+    def test_demoted_author_posts_are_backfilled(self):
+        Follow.objects.create(user=self.popular_user, author=self.author_user)
+        post = Post.objects.create(text=POST_TEXT, author=self.author_user)
+        self.assertTrue(UserStats.objects.get(
+            user=self.author_user
+        ).fanout_skipped)
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=self.popular_user).delete()
+        self.assertFalse(UserStats.objects.get(
+            user=self.author_user
+        ).fanout_skipped)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=post
+        ).exists())
+        self.assertEqual(self.feed(), [post])
+
+    @mock.patch('posts.timeline.TIMELINE_BACKFILL_SIZE', 1)
+    def test_follow_backfills_recent_posts_only(self):
+        Follow.objects.all().delete()
+        Post.objects.create(text=POST_TEXT, author=self.author_user)
+        post = Post.objects.create(text=POST_TEXT, author=self.author_user)
+        Follow.objects.create(user=self.user, author=self.author_user)
+        self.assertEqual(self.feed(), [post])
+
+    def test_rebuild_timeline_command(self):
+        post = Post.objects.create(text=POST_TEXT, author=self.author_user)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline')
+        self.assertEqual(self.feed(), [post])
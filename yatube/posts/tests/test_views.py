@@ -1,15 +1,17 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..models import Comment, Follow, Group, Post, User
-from ..settings import POSTS_PER_PAGE
+from ..settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 
 
 AUTHOR_USERNAME = 'TestAuthor'
@@ -18,6 +20,7 @@ GROUP_TITLE = 'Тестовая группа'
 GROUP_SLUG = 'test-slug'
 GROUP_DESCRIPTION = 'Тестовое описание'
 POST_TEXT = 'Тестовый текст'
+NEW_POST_TEXT = 'Новый текст'
 GROUP_2_TITLE = 'Тестовая группа2'
 GROUP_2_SLUG = 'test-slug2'
 GROUP_2_DESCRIPTION = 'Тестовое описание2'
@@ -122,6 +125,25 @@ class PostPagesTest(TestCase):
         self.assertEqual(post_comment.author, self.comment.author)
         self.assertEqual(post_comment.post, self.comment.post)
 
+    def test_comments_are_paginated_by_cursor(self):
+        Comment.objects.bulk_create([
+            Comment(text=f'Комментарий {i}', post=self.post,
+                    author=self.user)
+            for i in range(COMMENTS_PER_PAGE)
+        ])
+        first = self.another.get(self.POST_DETAIL_URL).context['comments']
+        self.assertEqual(len(first), COMMENTS_PER_PAGE)
+        self.assertTrue(first.has_next())
+        second = self.another.get(
+            self.POST_DETAIL_URL, {'after': first.next_cursor}
+        ).context['comments']
+        self.assertEqual(len(second), 1)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            {comment.pk for comment in list(first) + list(second)},
+            set(self.post.comments.values_list('pk', flat=True)),
+        )
+
     def test_post_does_not_exist_on_wrong_pages(self):
         urls = [
             GROUP_LIST_2_URL,
@@ -162,11 +184,30 @@ class PostPagesTest(TestCase):
 
     def test_cache_index_page(self):
         index_page = self.author.get(INDEX_URL).content
-        Post.objects.all().delete()
+        Post.objects.filter(pk=self.post.pk).update(text=NEW_POST_TEXT)
         self.assertEqual(self.author.get(INDEX_URL).content, index_page)
-        cache.delete(make_template_fragment_key('index_page'))
+        Post.objects.all().delete()
         self.assertNotEqual(self.author.get(INDEX_URL).content, index_page)
 
+    def test_feed_caches_are_invalidated_by_signals(self):
+        urls = [INDEX_URL, GROUP_LIST_URL, PROFILE_URL]
+        changes = [
+            lambda: Post.objects.create(
+                text=NEW_POST_TEXT, author=self.author_user, group=self.group
+            ),
+            lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+            lambda: User.objects.get(pk=self.author_user.pk).save(),
+        ]
+        for number, change in enumerate(changes):
+            for url in urls:
+                self.author.get(url)
+            text = f'{NEW_POST_TEXT} {number}'
+            Post.objects.filter(pk=self.post.pk).update(text=text)
+            change()
+            for url in urls:
+                with self.subTest(url=url, change=number):
+                    self.assertIn(text, self.author.get(url).content.decode())
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -188,16 +229,76 @@ class PaginatorViewsTest(TestCase):
         cls.guest = Client()
 
     def test_paginator(self):
-        urls_expected_post_number = [
-            [INDEX_URL, POSTS_PER_PAGE],
-            [GROUP_LIST_URL, POSTS_PER_PAGE],
-            [PROFILE_URL, POSTS_PER_PAGE],
-            [f'{INDEX_URL}?page=2', 1],
-            [f'{GROUP_LIST_URL}?page=2', 1],
-            [f'{PROFILE_URL}?page=2', 1],
-        ]
-        for url, expected_post_number in urls_expected_post_number:
+        for url in [INDEX_URL, GROUP_LIST_URL, PROFILE_URL]:
+            with self.subTest(url=url):
+                first_page = self.guest.get(url).context['page_obj']
+                self.assertEqual(len(first_page), POSTS_PER_PAGE)
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+                second_page = self.guest.get(
+                    url, {'after': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), 1)
+                self.assertEqual(second_page.number, 2)
+                self.assertFalse(second_page.has_next())
+                self.assertNotIn(second_page[0], list(first_page))
+                back_page = self.guest.get(
+                    url, {'before': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_feed_cache_is_page_aware(self):
+        for url in [INDEX_URL, GROUP_LIST_URL, PROFILE_URL]:
             with self.subTest(url=url):
                 response = self.guest.get(url)
-                self.assertEqual(len(response.context['page_obj']),
-                                 expected_post_number)
+                second_page = self.guest.get(url, {
+                    'after': response.context['page_obj'].next_cursor
+                })
+                self.assertNotIn(
+                    'Тестовый текст 1<', second_page.content.decode()
+                )
+                self.assertIn(
+                    'Тестовый текст 0<', second_page.content.decode()
+                )
+
+    def test_paginator_deep_page_costs_same_as_first(self):
+        first_page = self.guest.get(INDEX_URL).context['page_obj']
+        with self.assertNumQueries(
+            len(self.captured_queries(INDEX_URL))
+        ):
+            self.guest.get(INDEX_URL, {'after': first_page.next_cursor})
+
+    def test_paginator_broken_cursor_gives_first_page(self):
+        page_obj = self.guest.get(
+            INDEX_URL, {'after': 'broken'}
+        ).context['page_obj']
+        self.assertEqual(page_obj.number, 1)
+        self.assertEqual(len(page_obj), POSTS_PER_PAGE)
+
+    def test_paginator_count_is_cached_and_invalidated_on_write(self):
+        cache.clear()
+        paginator = self.guest.get(INDEX_URL).context['page_obj'].paginator
+        self.assertEqual(paginator.count, POSTS_PER_PAGE + 1)
+        self.assertEqual(paginator.total_pages, 2)
+        self.assertFalse(paginator.count_is_estimate)
+        # Только сама страница, без COUNT(*).
+        with self.assertNumQueries(1):
+            self.guest.get(INDEX_URL).context['page_obj'].paginator.count
+        Post.objects.create(text=POST_TEXT, author=self.author_user)
+        paginator = self.guest.get(INDEX_URL).context['page_obj'].paginator
+        self.assertEqual(paginator.count, POSTS_PER_PAGE + 2)
+
+    @mock.patch('posts.feeds.FEED_COUNT_LIMIT', POSTS_PER_PAGE)
+    def test_paginator_count_becomes_estimate_for_large_feed(self):
+        cache.clear()
+        paginator = self.guest.get(
+            GROUP_LIST_URL
+        ).context['page_obj'].paginator
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertEqual(paginator.count, POSTS_PER_PAGE)
+        self.assertEqual(paginator.total_pages, 1)
+
+    def captured_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.guest.get(url)
+        return context.captured_queries
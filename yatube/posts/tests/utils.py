@@ -0,0 +1,20 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в фиксированный бюджет запросов.
+
+    Бюджет не зависит от числа постов на странице, поэтому любой N+1
+    в шаблоне или queryset'е валит тест.
+    """
+
+    def assertQueryBudget(self, client, url, budget):
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        queries = context.captured_queries
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url}: {len(queries)} запросов при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries)
+        )
@@ -0,0 +1,144 @@
+"""Заблаговременная генерация миниатюр и вариантов картинок постов.
+
+Без неё sorl создаёт миниатюру при первом рендере страницы, и первые
+читатели свежего поста ждут ресайза внутри запроса. Генерация ставится
+в фоновый пул потоков после коммита транзакции, поэтому ответ
+на сохранение поста её не ждёт (с THUMBNAILS_SYNC - ждёт).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.functional import SimpleLazyObject
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import variants
+from .settings import POST_THUMBNAILS, THUMBNAIL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+)
+
+
+def generate(name, force=False):
+    """Создаёт все миниатюры картинки ``name`` из хранилища медиа.
+
+    ``force`` сначала удаляет уже созданные миниатюры, например после
+    смены геометрии или качества.
+    """
+    if force:
+        delete(name, delete_file=False)
+    for geometry, options in POST_THUMBNAILS:
+        get_thumbnail(name, geometry, **options)
+
+
+def prepare(post_id, name, force=False):
+    """Миниатюры и адаптивные варианты картинки поста."""
+    generate(name, force)
+    variants.build(post_id)
+
+
+def _prepare_in_background(post_id, name):
+    try:
+        prepare(post_id, name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        # Поток пула живёт долго, соединение с базой ему держать незачем.
+        connection.close()
+
+
+def _submit(post_id, name):
+    if settings.THUMBNAILS_SYNC:
+        prepare(post_id, name)
+    else:
+        executor.submit(_prepare_in_background, post_id, name)
+
+
+def schedule(post):
+    """Ставит в очередь миниатюры картинки поста после коммита."""
+    if post.image:
+        post_id, name = post.pk, post.image.name
+        transaction.on_commit(lambda: _submit(post_id, name))
+
+
+def thumbnail_file(name, geometry, options):
+    """ImageFile миниатюры под тем именем, которое дал бы ей sorl.
+
+    Повторяет подготовку опций из ThumbnailBackend.get_thumbnail,
+    но не обращается ни к хранилищу, ни к key-value store.
+    """
+    backend = default.backend
+    source = ImageFile(name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage,
+    )
+
+
+def lookup(names):
+    """Готовые миниатюры картинок ленты: {имя картинки: ImageFile}.
+
+    Вместо запроса к кэшу и базе на каждый тег {% thumbnail %} -
+    один get_many к кэшу и один запрос к базе за промахи. Картинки
+    без готовой миниатюры в ответ не попадают.
+    """
+    geometry, options = POST_THUMBNAILS[0]
+    keys = {
+        add_prefix(thumbnail_file(name, geometry, options).key): name
+        for name in set(names)
+    }
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        found = {key: kvstore._get_raw(key) for key in keys}
+    else:
+        found = kvstore.cache.get_many(list(keys))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            kvstore.cache.set_many(
+                stored, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            found.update(stored)
+    return {
+        keys[key]: deserialize_image_file(value)
+        for key, value in found.items()
+        if isinstance(value, (str, bytes))
+    }
+
+
+def prefetch(posts):
+    """Лениво подставляет постам страницы готовые миниатюры.
+
+    Все миниатюры страницы ищутся одним lookup() при первом обращении
+    к ``post.thumbnail`` в шаблоне, поэтому страница, отданная
+    из кэша фрагментов, не делает ни одного запроса.
+    """
+    posts = [post for post in posts if post.image and not post.variants]
+    found = SimpleLazyObject(
+        lambda: lookup(post.image.name for post in posts)
+    )
+    for post in posts:
+        post.thumbnail = SimpleLazyObject(
+            lambda name=post.image.name: found.get(name)
+        )
@@ -0,0 +1,215 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Пост обычного автора при публикации раскладывается по лентам всех его
+подписчиков. Посты популярных авторов в ленты не пишутся и подмешиваются
+при чтении, чтобы один пост не порождал миллионы строк.
+
+Какие авторы подмешиваются при чтении, хранит UserStats.fanout_skipped,
+а не число подписчиков: иначе посты, пропущенные при записи, пропадали
+бы из лент, как только автор перестал быть популярным. Флаг сверяется
+с TIMELINE_FANOUT_LIMIT в sync_popularity() при подписке, отписке и
+публикации поста автора и в rebuild(); снимая флаг, она дописывает
+в ленты подписчиков последние посты автора. После смены лимита автор
+до такой сверки остаётся в прежнем режиме, но посты не теряются.
+"""
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.paginator import CursorPaginator
+from .models import Follow, Post, TimelineEntry, UserStats
+from .settings import (
+    FOLLOWING_CACHE_TIMEOUT, POPULAR_AUTHORS_CACHE_KEY,
+    POPULAR_AUTHORS_CACHE_TIMEOUT,
+    TIMELINE_BACKFILL_SIZE, TIMELINE_BATCH_SIZE, TIMELINE_FANOUT_LIMIT,
+)
+
+
+def popular_author_ids():
+    return cache.get_or_set(
+        POPULAR_AUTHORS_CACHE_KEY,
+        lambda: set(UserStats.objects.filter(
+            fanout_skipped=True
+        ).values_list('user_id', flat=True)),
+        POPULAR_AUTHORS_CACHE_TIMEOUT,
+    )
+
+
+def following_key(user_id):
+    return f'timeline:following:{user_id}'
+
+
+def followed_author_ids(user_id):
+    """Авторы, на которых подписан пользователь, по возрастанию id."""
+    return cache.get_or_set(
+        following_key(user_id),
+        lambda: list(Follow.objects.filter(user_id=user_id).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True)),
+        FOLLOWING_CACHE_TIMEOUT,
+    )
+
+
+def _recent_posts(author_id):
+    return Post.objects.filter(author_id=author_id).order_by(
+        '-created', '-pk'
+    )[:TIMELINE_BACKFILL_SIZE]
+
+
+def sync_popularity(author_ids=None):
+    """Сверяет fanout_skipped авторов (по умолчанию всех) с числом
+    подписчиков. Переставшим быть популярными дописывает в ленты
+    подписчиков последние посты."""
+    stats = UserStats.objects.all()
+    if author_ids is not None:
+        stats = stats.filter(user_id__in=author_ids)
+    with transaction.atomic():
+        promoted = stats.filter(
+            fanout_skipped=False, followers_count__gt=TIMELINE_FANOUT_LIMIT
+        ).update(fanout_skipped=True)
+        demoted = list(stats.filter(
+            fanout_skipped=True, followers_count__lte=TIMELINE_FANOUT_LIMIT
+        ).values_list('user_id', flat=True))
+        for author_id in demoted:
+            _insert_followed_posts(
+                Follow.objects.filter(author_id=author_id),
+                _recent_posts(author_id),
+            )
+        UserStats.objects.filter(user_id__in=demoted).update(
+            fanout_skipped=False
+        )
+    if promoted or demoted:
+        cache.delete(POPULAR_AUTHORS_CACHE_KEY)
+
+
+def _fanout_skipped(author_id):
+    """Пропускать ли раскладку постов автора; решается по базе, а не
+    по кэшу, чтобы не разойтись с флагом, по которому читают ленты."""
+    stats = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', 'fanout_skipped'
+    ).first()
+    if stats is None:
+        return False
+    followers_count, skipped = stats
+    popular = followers_count > TIMELINE_FANOUT_LIMIT
+    if popular != skipped:
+        sync_popularity([author_id])
+    return popular
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, TIMELINE_BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if _fanout_skipped(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, created=post.created)
+        for user_id in followers.iterator()
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    cache.delete(following_key(user_id))
+    if _fanout_skipped(author_id):
+        return
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, created=created)
+        for post_id, created in _recent_posts(author_id).values_list(
+            'id', 'created'
+        )
+    )
+
+
+def remove_author(user_id, author_id):
+    cache.delete(following_key(user_id))
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    sync_popularity([author_id])
+
+
+def _insert_followed_posts(follows, posts=None):
+    """Одним INSERT ... SELECT раскладывает по лентам посты posts (по
+    умолчанию все) авторов из подписок follows, без объектов в памяти.
+    Уже лежащие в лентах записи пропускаются."""
+    follows_sql, params = follows.values(
+        'user_id', 'author_id'
+    ).query.sql_with_params()
+    source = Post._meta.db_table
+    if posts is not None:
+        posts_sql, posts_params = posts.values(
+            'id', 'created', 'author_id'
+        ).query.sql_with_params()
+        source = f'({posts_sql})'
+        params = (*params, *posts_params)
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{TimelineEntry._meta.db_table} '
+            f'(user_id, post_id, created) '
+            f'SELECT follow.user_id, post.id, post.created '
+            f'FROM ({follows_sql}) follow '
+            f'INNER JOIN {source} post '
+            f'ON post.author_id = follow.author_id '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params,
+        )
+
+
+def rebuild(users=None):
+    """Пересобирает ленты заданных пользователей (по умолчанию всех)."""
+    sync_popularity()
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.exclude(author__stats__fanout_skipped=True)
+    if users is not None:
+        entries = entries.filter(user__in=users)
+        follows = follows.filter(user__in=users)
+    with transaction.atomic():
+        entries.delete()
+        _insert_followed_posts(follows)
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорная лента подписок: материализованные записи + посты
+    популярных авторов, слитые по (created, id)."""
+
+    def __init__(self, user, per_page):
+        popular = popular_author_ids()
+        posts = Post.objects.none()
+        if popular:
+            posts = Post.objects.select_related('author', 'group').filter(
+                author__following__user=user, author_id__in=popular
+            )
+        super().__init__(posts, per_page)
+        self.entries = TimelineEntry.objects.filter(
+            user=user
+        ).select_related('post__author', 'post__group')
+
+    def _fetch(self, cursor, reverse):
+        entries = self.entries
+        if cursor is not None:
+            entries = self._seek(entries, cursor, reverse, pk='post_id')
+        entries = entries.order_by(
+            *self._order(reverse, pk='post_id')
+        )[:self.per_page + 1]
+        posts = {post.pk: post for post in super()._fetch(cursor, reverse)}
+        posts.update((entry.post_id, entry.post) for entry in entries)
+        return sorted(
+            posts.values(),
+            key=lambda post: (getattr(post, self.field), post.pk),
+            reverse=self.descending != reverse,
+        )[:self.per_page + 1]
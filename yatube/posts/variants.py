@@ -0,0 +1,131 @@
+"""Адаптивные варианты картинок постов для <picture>/srcset.
+
+Каждая картинка нарезается в несколько ширин и форматов (AVIF и WebP,
+если их умеет установленный Pillow, и запасной JPEG). Имена и размеры
+вариантов хранятся в ``Post.image_variants``, поэтому рендер страницы
+не обращается к файловой системе. Там же, из того же декодированного
+кадра, считается размытая заглушка ``Post.image_placeholder``.
+"""
+import base64
+import json
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core import storage as files
+from core.middleware import bump_page_generation
+from . import feeds
+from .models import Post
+from .settings import (
+    IMAGE_PLACEHOLDER_QUALITY, IMAGE_PLACEHOLDER_WIDTH,
+    IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_RATIO,
+    IMAGE_VARIANT_WIDTHS,
+)
+
+try:
+    # Старым Pillow AVIF добавляет плагин, если он установлен.
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+VARIANTS_DIR = 'posts/variants/'
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+FALLBACK_FORMAT = 'JPEG'
+
+
+def supported_formats():
+    Image.init()
+    return [
+        image_format for image_format in IMAGE_VARIANT_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def variant_widths(source_width):
+    """Ширины вариантов; больше исходной - только самая узкая."""
+    widths = [
+        width for width in IMAGE_VARIANT_WIDTHS if width <= source_width
+    ]
+    return widths or [min(IMAGE_VARIANT_WIDTHS)]
+
+
+def variant_size(width):
+    ratio_width, ratio_height = IMAGE_VARIANT_RATIO
+    return width, max(round(width * ratio_height / ratio_width), 1)
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=IMAGE_VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def placeholder(image):
+    """Data URI крошечного JPEG того же кадра - заглушка до загрузки
+    картинки, браузер сам растягивает и размывает её."""
+    tiny = ImageOps.fit(
+        image, variant_size(IMAGE_PLACEHOLDER_WIDTH), Image.LANCZOS
+    )
+    buffer = BytesIO()
+    tiny.save(buffer, 'JPEG', quality=IMAGE_PLACEHOLDER_QUALITY)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def build(post_id):
+    """Создаёт варианты и заглушку картинки поста и сохраняет их
+    в посте."""
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'image_variants', 'author', 'group'
+    ).first()
+    if post is None or not post.image:
+        return
+    storage = post.image.storage
+    name = post.image.name
+    with storage.open(name) as source:
+        image = Image.open(source)
+        image = image.convert('RGB')
+    stem = os.path.splitext(os.path.basename(name))[0]
+    encoded = []
+    for width in variant_widths(image.width):
+        size = variant_size(width)
+        # Кадрирование по центру, как crop="center" у миниатюры.
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        for image_format in supported_formats():
+            encoded.append((
+                {'format': image_format, 'width': size[0],
+                 'height': size[1]},
+                f'{VARIANTS_DIR}{stem}_{width}.{EXTENSIONS[image_format]}',
+                _encode(resized, image_format),
+            ))
+    image_placeholder = placeholder(image)
+    # Файлы и ссылки на них (core.storage) - одной транзакцией; кодируется
+    # всё заранее, чтобы не держать транзакцию во время работы Pillow.
+    with transaction.atomic():
+        variants = [
+            {**variant, 'name': storage.save(variant_name, content)}
+            for variant, variant_name, content in encoded
+        ]
+        names = [variant['name'] for variant in variants]
+        files.retain(names)
+        updated = Post.objects.filter(pk=post_id, image=name).update(
+            image_variants=json.dumps(variants),
+            image_placeholder=image_placeholder,
+        )
+        # Пока шла нарезка, картинку могли сменить - тогда выбрасываем
+        # новые варианты, иначе прежние. Файлы удаляются, только если
+        # на них не ссылаются другие посты с той же картинкой.
+        files.release(names if not updated else [
+            variant['name'] for variant in post.variants
+        ])
+    if updated:
+        feeds.bump_versions(feeds.post_feeds(post))
+        bump_page_generation()
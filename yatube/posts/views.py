@@ -1,34 +1,71 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-
+from django.views.decorators.http import require_safe
+
+from core.paginator import CursorPaginator
+from . import exporter, thumbnails
+from .conditions import (
+    conditional, follow_etag, group_etag, group_last_modified, index_etag,
+    index_last_modified, post_etag, post_last_modified, profile_etag,
+    profile_last_modified,
+)
+from .feeds import (
+    INDEX_FEED, FeedPaginator, author_feed, group_feed, page_cache,
+)
 from .forms import PostForm, CommentForm
 from .models import Follow, Group, Post, User
-from .settings import POSTS_PER_PAGE
+from .search import SearchPaginator, build_query
+from .settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
+from .timeline import TimelinePaginator
+
 
+def cursor_page(request, paginator):
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    thumbnails.prefetch(page)
+    return page
 
-def paginated_page(request, post_list):
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
 
+def paginated_page(request, post_list, feed):
+    return cursor_page(
+        request, FeedPaginator(post_list, POSTS_PER_PAGE, feed)
+    )
 
+
+@conditional(index_etag, index_last_modified)
 def index(request):
     return render(request, 'posts/index.html', {
-        'page_obj': paginated_page(request, Post.objects.all()),
+        'page_obj': paginated_page(
+            request, Post.objects.select_related('author', 'group'),
+            INDEX_FEED,
+        ),
+        'feed_cache': page_cache(request, INDEX_FEED),
     })
 
 
+@conditional(group_etag, group_last_modified)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': paginated_page(request, group.posts.all()),
+        'page_obj': paginated_page(
+            request, group.posts.select_related('author', 'group'),
+            group_feed(group.id),
+        ),
+        'feed_cache': page_cache(request, group_feed(group.id)),
     })
 
 
+@conditional(profile_etag, profile_last_modified)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     following = (
         request.user.is_authenticated
         and request.user != author
@@ -39,14 +76,37 @@ def profile(request, username):
     return render(request, 'posts/profile.html', {
         'author': author,
         'following': following,
-        'page_obj': paginated_page(request, author.posts.all()),
+        'page_obj': paginated_page(
+            request, author.posts.select_related('author', 'group'),
+            author_feed(author.id),
+        ),
+        'feed_cache': page_cache(request, author_feed(author.id)),
     })
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': cursor_page(
+            request, SearchPaginator(build_query(query), POSTS_PER_PAGE)
+        ),
+    })
+
+
+@conditional(post_etag, post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    # Комментарии - курсорными страницами по индексу (post, created, id):
+    # первая страница стоит одинаково при любом числе комментариев.
+    comments = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PER_PAGE
+    ).get_page(after=request.GET.get('after'))
     return render(request, 'posts/post_detail.html', {
         'post': post,
+        'comments': comments,
         'form': CommentForm(request.POST or None),
     })
 
@@ -59,7 +119,10 @@ def post_create(request):
                       {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    # Файл картинки и ссылка на него (core.storage) - одной транзакцией.
+    with transaction.atomic():
+        post.save()
+    thumbnails.schedule(post)
     return redirect('posts:profile', request.user.username)
 
 
@@ -76,7 +139,10 @@ def post_edit(request, post_id):
     if not form.is_valid():
         return render(request, 'posts/create_post.html',
                       {'form': form, 'is_edit': True})
-    post = form.save()
+    with transaction.atomic():
+        post = form.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post)
     return redirect('posts:post_detail', post_id)
 
 
@@ -93,10 +159,11 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional(follow_etag)
 def follow_index(request):
     return render(request, 'posts/follow.html', {
-        'page_obj': paginated_page(
-            request, Post.objects.filter(author__following__user=request.user)
+        'page_obj': cursor_page(
+            request, TimelinePaginator(request.user, POSTS_PER_PAGE)
         ),
     })
 
@@ -117,3 +184,29 @@ def profile_unfollow(request, username):
         author__username=username,
     ).delete()
     return redirect('posts:profile', username=username)
+
+
+@staff_member_required
+@require_safe
+def export(request):
+    """Выгрузка постов (?group=, ?author=) и комментариев к ним,
+    ?format=csv|ndjson, ?comments=0 - без комментариев."""
+    export_format = request.GET.get('format')
+    if export_format not in exporter.FORMATS:
+        export_format = exporter.FORMATS[0]
+    response = StreamingHttpResponse(
+        exporter.stream(
+            exporter.records(
+                group=request.GET.get('group'),
+                author=request.GET.get('author'),
+                comments=request.GET.get('comments') != '0',
+            ),
+            export_format,
+            gzip=True,
+        ),
+        content_type='application/gzip',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube.{export_format}.gz"'
+    )
+    return response
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'about.apps.AboutConfig',
     'core.apps.CoreConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -53,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +64,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
 ]
 
 INTERNAL_IPS = [
@@ -73,7 +77,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templating.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -145,6 +149,15 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся на диск по частям, в памяти файл целиком не бывает;
+# сверх UPLOAD_MAX_FILE_SIZE байт файл не дописывается и отклоняется.
+FILE_UPLOAD_HANDLERS = ['core.uploads.LimitedTemporaryFileUploadHandler']
+UPLOAD_MAX_FILE_SIZE = 20 * 1024 * 1024
+# Миниатюры и варианты картинок новых постов создаются в фоновом пуле
+# потоков (posts.thumbnails); с THUMBNAILS_SYNC - сразу после коммита,
+# в том же потоке (тесты на SQLite в памяти).
+THUMBNAILS_SYNC = False
+
 
 LOGIN_URL = 'users:login'
 
@@ -161,6 +174,68 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.LocMemCache',
     }
 }
+
+# Кэш целых страниц для анонимных пользователей
+# (core.middleware.AnonymousPageCacheMiddleware).
+PAGE_CACHE_ENABLED = not DEBUG
+PAGE_CACHE_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'api:index',
+    'api:group_list',
+    'api:profile',
+    'api:post_detail',
+]
+PAGE_CACHE_SOFT_TIMEOUT = 60
+PAGE_CACHE_TIMEOUT = 60 * 60
+PAGE_CACHE_LOCK_TIMEOUT = 30
+
+# Метрики запросов в формате Prometheus на /metrics (core.metrics).
+# С несколькими процессами сервера METRICS_DIR - общий для них каталог
+# снимков, без него /metrics показывает только ответивший процесс.
+METRICS_ENABLED = True
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+# Замеры каждого шаблона, include и фильтра (core.templating); стоят
+# заметного времени на каждый вызов, поэтому включаются явно.
+TEMPLATE_PROFILING_ENABLED = False
+
+# Выборочный журнал медленных SQL-запросов (core.slow_queries):
+# запросы дольше порога (секунды) попадают в журнал с вероятностью
+# SLOW_QUERY_SAMPLE_RATE.
+SLOW_QUERY_LOG_ENABLED = True
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_SAMPLE_RATE = 1.0
+SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'slow_queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.slow_queries.JsonFormatter'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'yatube.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}